@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete
 
 
 class AuthappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authapp'
+
+    def ready(self):
+        from rest_framework.authtoken.models import Token
+        from .authentication import invalidate_deleted_token
+        post_delete.connect(invalidate_deleted_token, sender=Token)
@@ -0,0 +1,51 @@
+import os
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from backend.cache import CacheNamespace
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+auth_cache = CacheNamespace('auth', alias='auth')
+# How long a token -> user id lookup may be served from the cache.
+TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 60))
+
+
+def token_cache_key(key):
+    # Hash the token so raw credentials never appear in cache keys.
+    return 'token:{}'.format(hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+
+def invalidate_cached_token(key):
+    auth_cache.delete(token_cache_key(key))
+
+
+def invalidate_deleted_token(sender, instance, **kwargs):
+    # Connected to Token post_delete, so every deletion path (views, admin, shell) drops the entry.
+    invalidate_cached_token(instance.key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that caches which user a token belongs to for a short
+    TTL, so most requests skip the token lookup. Only the user id is cached:
+    no password hash or token ever reaches the cache, and the user is re-read
+    on every request, so deactivation and profile changes apply at once.
+    Deleted tokens are dropped from the cache by a post_delete signal.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        user_id = auth_cache.get(cache_key)
+        if user_id is None:
+            user, token = super().authenticate_credentials(key)
+            auth_cache.set(cache_key, user.pk, TOKEN_CACHE_TIMEOUT)
+            return user, token
+
+        user = get_user_model().objects.filter(pk=user_id).first()
+        if user is None or not user.is_active:
+            invalidate_cached_token(key)
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return user, Token(key=key, user=user)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from authapp.outbox import run_email_dispatcher, EMAIL_DISPATCH_INTERVAL
+
+
+class Command(BaseCommand):
+    help = "Send queued outbox emails in batches over a single SMTP connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=EMAIL_DISPATCH_INTERVAL,
+                            help="Seconds to wait between outbox polls.")
+        parser.add_argument('--once', action='store_true', help="Drain the outbox once and exit.")
+
+    def handle(self, *args, **options):
+        try:
+            run_email_dispatcher(interval=options['interval'], once=options['once'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Email dispatcher stopped."))
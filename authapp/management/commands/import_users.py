@@ -0,0 +1,97 @@
+import csv
+import traceback
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction, IntegrityError
+
+from authapp.models import User
+
+USER_IMPORT_FIELDS = ('fullName', 'location', 'bio', 'niche')
+USER_IMPORT_RETRIES = 3
+
+
+class Command(BaseCommand):
+    help = "Bulk import users from a CSV file with an 'email' column and optional username, password, fullName, location, bio and niche columns."
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', type=str, help="Path to the CSV file.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Users inserted per query.")
+
+    def handle(self, *args, **options):
+        csv_file_path = options['csv_file']
+        batch_size = options['batch_size']
+        created = skipped = 0
+
+        try:
+            with open(csv_file_path, newline='', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                batch = []
+                for row in reader:
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        new, existing = self.import_batch(batch)
+                        created += new
+                        skipped += existing
+                        batch = []
+                if batch:
+                    new, existing = self.import_batch(batch)
+                    created += new
+                    skipped += existing
+        except FileNotFoundError:
+            raise CommandError(f"File '{csv_file_path}' does not exist.")
+        except Exception as e:
+            tb = traceback.format_exc()
+            raise CommandError(f"An error occurred while importing users: {e}\n\nTraceback:\n{tb}")
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {created} users, skipped {skipped} existing or duplicate emails."))
+
+    def import_batch(self, rows):
+        """
+        Insert one batch of rows. Returns (created, skipped) counts.
+        """
+        rows_by_email = {}
+        for row in rows:
+            email = User.objects.normalize_email((row.get('email') or '').strip())
+            if email and email not in rows_by_email:
+                rows_by_email[email] = row
+        existing = set(User.objects.filter(email__in=rows_by_email).values_list('email', flat=True))
+        rows_by_email = {email: row for email, row in rows_by_email.items() if email not in existing}
+
+        users = []
+        for email, row in rows_by_email.items():
+            user = User(
+                email=email,
+                username=(row.get('username') or '').strip(),
+                **{field: row[field].strip() for field in USER_IMPORT_FIELDS if row.get(field)}
+            )
+            if row.get('password'):
+                user.set_password(row['password'])
+            else:
+                user.set_unusable_password()
+            users.append(user)
+
+        # Rows without a username, or whose username is already taken, get one generated.
+        requested = [user.username for user in users if user.username]
+        taken = set(User.objects.filter(username__in=requested).values_list('username', flat=True))
+        generated, seen = [], set()
+        for user in users:
+            if not user.username or user.username in taken or user.username in seen:
+                generated.append(user)
+            else:
+                seen.add(user.username)
+
+        for attempt in range(USER_IMPORT_RETRIES):
+            # Names kept by other rows of this batch are not in the database yet, so reserve them explicitly.
+            usernames = User.objects.generate_unique_usernames([user.email for user in generated], reserved=seen)
+            for user, username in zip(generated, usernames):
+                user.username = username
+            try:
+                with transaction.atomic():
+                    User.objects.bulk_create(users)
+                break
+            except IntegrityError:
+                # A concurrent signup claimed one of the usernames; regenerate and retry.
+                if attempt == USER_IMPORT_RETRIES - 1:
+                    raise
+
+        return len(users), len(rows) - len(users)
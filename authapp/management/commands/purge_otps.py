@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from authapp.otp import purge_expired_otps
+
+
+class Command(BaseCommand):
+    help = "Delete used and expired OTP rows left by the database fallback."
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_otps()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} OTP rows."))
@@ -1,12 +1,18 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.contrib.auth.models import BaseUserManager, AbstractBaseUser
 from django.utils import timezone
 from datetime import timedelta
-import random, string
+import os, random, string
 from .storage_backends import FirebaseStorage
 from django.conf import settings
 from brands_insightapp.models import Brand
 
+# Candidate usernames checked per email and query, and save attempts when a generated one is taken concurrently.
+USERNAME_CANDIDATES = 10
+USERNAME_SAVE_RETRIES = 3
+# Seconds an OTP code stays valid, in the cache and in the OTP table.
+OTP_TTL = int(os.getenv('OTP_TTL', 180))
+
 
 class UserManager(BaseUserManager):
     def create_user(self, email, username=None, password=None, **extra_fields):
@@ -14,34 +20,82 @@ class UserManager(BaseUserManager):
             raise ValueError('The email must be set')
         
         email = self.normalize_email(email)
-        if not username:
+        generated = not username
+        if generated:
             username = self.generate_unique_username(email)
 
         extra_fields.pop('username', None)  # Prevent duplicate username key
 
         user = self.model(email=email, username=username, **extra_fields)
         user.set_password(password)
-        user.save(using=self._db)
+        if generated:
+            self.save_with_unique_username(user)
+        else:
+            user.save(using=self._db)
         return user
 
+    def save_with_unique_username(self, user):
+        """
+        Save a user whose username was generated, picking a new one if another
+        insert claimed it between the availability check and this save.
+        """
+        for attempt in range(USERNAME_SAVE_RETRIES):
+            try:
+                with transaction.atomic(using=self._db):
+                    user.save(using=self._db)
+                return user
+            except IntegrityError:
+                if attempt == USERNAME_SAVE_RETRIES - 1:
+                    raise
+                user.username = self.generate_unique_username(user.email)
+
     def create_superuser(self, email, password=None, **extra_fields):
         extra_fields.setdefault('is_staff', True)
         extra_fields.setdefault('is_superuser', True)
 
-        if not extra_fields.get('username'):
-            extra_fields['username'] = self.generate_unique_username(email)
-
-        return self.create_user(email, password, **extra_fields)
+        # create_user generates a username when none is given.
+        return self.create_user(email, password=password, **extra_fields)
     
     def generate_unique_username(self, email):
-        base_username = email.split('@')[0]
-        username = base_username
+        return self.generate_unique_usernames([email])[0]
 
-        while User.objects.filter(username=username).exists():
-            random_str = ''.join(random.choices(string.ascii_lowercase + string.digits, k=6))
-            username = f"{base_username}_{random_str}"
+    def generate_unique_usernames(self, emails, reserved=()):
+        """
+        Pick one free username per email, derived from its local part. Every round
+        checks a batch of candidates for all emails with a single `username__in`
+        query; the plain local part is tried first, then random suffixes.
+        Names in `reserved` (e.g. claimed by other rows of the same insert) are avoided too.
+        """
+        bases = [email.split('@')[0] for email in emails]
+        usernames = [None] * len(emails)
+        claimed = set(reserved)
+        pending = list(range(len(emails)))
+        first_round = True
 
-        return username
+        while pending:
+            candidates = {}
+            for i in pending:
+                options = [bases[i]] if first_round else []
+                options += [
+                    f"{bases[i]}_{''.join(random.choices(string.ascii_lowercase + string.digits, k=6))}"
+                    for _ in range(USERNAME_CANDIDATES)
+                ]
+                candidates[i] = options
+            all_candidates = {name for options in candidates.values() for name in options}
+            taken = set(self.filter(username__in=all_candidates).values_list('username', flat=True))
+
+            still_pending = []
+            for i in pending:
+                username = next((name for name in candidates[i] if name not in taken and name not in claimed), None)
+                if username is None:
+                    still_pending.append(i)
+                    continue
+                usernames[i] = username
+                claimed.add(username)
+            pending = still_pending
+            first_round = False
+
+        return usernames
 
 class User(AbstractBaseUser):
     
@@ -99,6 +153,13 @@ class OTP(models.Model):
     code = models.CharField(max_length=6)
     timestamp = models.DateTimeField(auto_now_add=True)
     expired = models.BooleanField(default=False)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Serves the "latest active code for a user" lookup of the fallback path.
+            models.Index(fields=["user", "expired", "-timestamp"], name="otp_user_active_idx"),
+        ]
 
     def generate_otp(self):
         self.code = str(random.randint(100000, 999999))
@@ -107,7 +168,7 @@ class OTP(models.Model):
         return self.code
 
     def is_expired(self):
-        return timezone.now() > (self.timestamp + timedelta(minutes=3))
+        return timezone.now() > (self.timestamp + timedelta(seconds=OTP_TTL))
     
 
 class InstaStats(models.Model):
@@ -129,13 +190,68 @@ class InstaPost(models.Model):
     post_number = models.PositiveIntegerField() # value from 1 to 12
     post_detail = models.JSONField()
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["insta_stats", "post_number"], name="instapost_stats_number_uniq"),
+        ]
+
     def __str__(self):
         return f"Post {self.post_number} of {self.insta_stats.userName}"
-    
+
+@transaction.atomic
+def upsert_insta_posts(insta_stats, posts):
+    """
+    Replace the post set of an InstaStats with `posts`, an iterable of
+    (post_number, post_detail) pairs: one bulk INSERT ... ON CONFLICT UPDATE
+    on (insta_stats, post_number) plus one DELETE of numbers no longer present.
+    """
+    # A later entry for the same number wins, as ON CONFLICT cannot touch a row twice.
+    details = dict(posts)
+    rows = [
+        InstaPost(insta_stats=insta_stats, post_number=number, post_detail=detail)
+        for number, detail in details.items()
+    ]
+    if rows:
+        InstaPost.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["insta_stats", "post_number"],
+            update_fields=["post_detail"],
+        )
+    insta_stats.posts.exclude(post_number__in=list(details)).delete()
+
 def create_insta_posts(insta_stats, posts_data):
-    for i in range(1, 13):
-        post_detail = posts_data[i-1] if i-1 < len(posts_data) else {}
-        InstaPost.objects.create(insta_stats=insta_stats, post_number=i, post_detail=post_detail) 
+    upsert_insta_posts(
+        insta_stats,
+        [(i, posts_data[i-1] if i-1 < len(posts_data) else {}) for i in range(1, 13)],
+    )
+
+class OutboxEmail(models.Model):
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    ]
+
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The dispatcher only ever scans due pending messages.
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_status_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
 
 class BrandSuggestion(models.Model):
     DECISION_CHOICES = [
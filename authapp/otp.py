@@ -0,0 +1,108 @@
+import os
+import hmac
+import secrets
+from datetime import timedelta
+
+from django.core.cache.backends.redis import RedisCache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from backend.cache import CacheNamespace
+from .models import OTP, OTP_TTL
+
+otp_cache = CacheNamespace('otp', alias='auth')
+OTP_MAX_ATTEMPTS = int(os.getenv('OTP_MAX_ATTEMPTS', 5))
+OTP_PURGE_CHUNK_SIZE = 1000
+
+
+def generate_code():
+    return str(secrets.randbelow(900000) + 100000)
+
+
+def otp_cache_is_atomic():
+    # Only Redis increments atomically; the file cache's incr() is a get+set
+    # that concurrent guesses could race past the attempt limit.
+    return isinstance(otp_cache.cache, RedisCache)
+
+
+def codes_match(stored, code):
+    # compare_digest rejects non-ASCII str input, so compare the encoded bytes.
+    return hmac.compare_digest(str(stored).encode('utf-8'), str(code).encode('utf-8'))
+
+
+def issue_otp(user):
+    """
+    Create a fresh code for the user, replacing any previous one. Codes live in
+    the shared cache with a TTL when it is Redis; otherwise, or when the cache
+    is unavailable, they are kept in the OTP table.
+    """
+    code = generate_code()
+    if otp_cache_is_atomic():
+        try:
+            otp_cache.set(f'attempts:{user.pk}', 0, OTP_TTL)
+            otp_cache.set(f'code:{user.pk}', code, OTP_TTL)
+            return code
+        except Exception as e:
+            print(f"OTP cache unavailable, storing code in the database: {str(e)}")
+    with transaction.atomic():
+        OTP.objects.filter(user=user, expired=False).update(expired=True)
+        OTP.objects.create(user=user, code=code)
+    return code
+
+
+def verify_otp(user, code):
+    """
+    Check a submitted code. Returns True when it matches (the code is then
+    consumed), False when it does not, and None when there is no live code,
+    i.e. it expired, was used, or ran out of attempts.
+    """
+    stored = None
+    if otp_cache_is_atomic():
+        try:
+            stored = otp_cache.get(f'code:{user.pk}')
+        except Exception as e:
+            print(f"OTP cache unavailable, checking the database: {str(e)}")
+    if stored is None:
+        return verify_db_otp(user, code)
+
+    try:
+        attempts = otp_cache.incr(f'attempts:{user.pk}')
+    except ValueError:
+        # The counter expired together with the code.
+        return None
+    if attempts > OTP_MAX_ATTEMPTS:
+        otp_cache.delete(f'code:{user.pk}')
+        return None
+    if not codes_match(stored, code):
+        return False
+    # Only the request that actually removes the code may use it.
+    return bool(otp_cache.delete(f'code:{user.pk}'))
+
+
+def verify_db_otp(user, code):
+    otp = OTP.objects.filter(user=user, expired=False).order_by('-timestamp').first()
+    if not otp:
+        return None
+    # The conditional increment is atomic, so concurrent guesses cannot exceed the limit.
+    counted = OTP.objects.filter(pk=otp.pk, attempts__lt=OTP_MAX_ATTEMPTS).update(attempts=F('attempts') + 1)
+    if otp.is_expired() or not counted:
+        OTP.objects.filter(pk=otp.pk).update(expired=True)
+        return None
+    if not codes_match(otp.code, code):
+        return False
+    return OTP.objects.filter(pk=otp.pk, expired=False).update(expired=True) == 1
+
+
+def purge_expired_otps():
+    """
+    Delete used, expired and stale fallback OTP rows in chunks. Returns the number deleted.
+    """
+    cutoff = timezone.now() - timedelta(seconds=OTP_TTL)
+    stale = OTP.objects.filter(expired=True) | OTP.objects.filter(timestamp__lt=cutoff)
+    deleted = 0
+    while True:
+        ids = list(stale.values_list('id', flat=True)[:OTP_PURGE_CHUNK_SIZE])
+        if not ids:
+            return deleted
+        deleted += OTP.objects.filter(id__in=ids).delete()[0]
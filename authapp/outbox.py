@@ -0,0 +1,175 @@
+import os
+import time
+import smtplib
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 50))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 5))
+EMAIL_DISPATCH_INTERVAL = int(os.getenv('EMAIL_DISPATCH_INTERVAL', 5))
+# Retry delays double from the base up to the cap.
+EMAIL_RETRY_BASE_DELAY = 30
+EMAIL_RETRY_MAX_DELAY = 3600
+# Claimed messages are hidden from other dispatchers for this long while being sent.
+EMAIL_CLAIM_LEASE = timedelta(minutes=5)
+
+
+def enqueue_email(subject, message, from_email, recipient_list):
+    """
+    Write a message to the outbox. Call it inside the request's transaction so
+    the email is only sent if the surrounding changes commit.
+    """
+    return OutboxEmail.objects.create(
+        subject=subject,
+        message=message,
+        from_email=from_email,
+        recipients=list(recipient_list),
+    )
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(EMAIL_RETRY_BASE_DELAY * 2 ** (attempts - 1), EMAIL_RETRY_MAX_DELAY))
+
+
+def claim_due_emails(batch_size=EMAIL_OUTBOX_BATCH_SIZE):
+    """
+    Lock a batch of due pending messages and push their next attempt past the
+    lease, so concurrent dispatchers never pick up the same rows.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status="pending", next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if emails:
+            OutboxEmail.objects.filter(id__in=[email.id for email in emails]).update(
+                next_attempt_at=now + EMAIL_CLAIM_LEASE
+            )
+    return emails
+
+
+def mark_failed_attempt(email, error):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = "failed"
+    else:
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+
+
+class EmailConnectionLost(Exception):
+    """
+    The SMTP connection dropped and could not be reopened.
+    """
+
+
+def is_connection_error(error):
+    # Refused recipients or rejected data are the message's fault; a dropped
+    # session or a socket error is the connection's.
+    return isinstance(error, smtplib.SMTPServerDisconnected) or (
+        isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+    )
+
+
+def send_with_reconnect(email, connection):
+    """
+    Send one message. If the server dropped the session (Gmail does this
+    routinely), reopen the connection and try the message once more.
+    """
+    message = EmailMessage(email.subject, email.message, email.from_email, email.recipients, connection=connection)
+    try:
+        message.send()
+    except Exception as e:
+        if not is_connection_error(e):
+            raise
+        connection.close()
+        try:
+            connection.open()
+        except Exception as open_error:
+            raise EmailConnectionLost(open_error) from e
+        message.send()
+
+
+def send_outbox_batch(connection, batch_size=EMAIL_OUTBOX_BATCH_SIZE):
+    """
+    Send one claimed batch over an already open connection. If the connection
+    is lost for good, the unsent rest of the batch is released for the next
+    run without being charged an attempt.
+    Returns (sent, failed, released) counts.
+    """
+    emails = claim_due_emails(batch_size)
+    sent = failed = 0
+    released = []
+    for index, email in enumerate(emails):
+        try:
+            send_with_reconnect(email, connection)
+            email.status = "sent"
+            email.sent_at = timezone.now()
+            sent += 1
+        except EmailConnectionLost as e:
+            print(f"SMTP connection lost, releasing {len(emails) - index} emails: {str(e)}")
+            released = emails[index:]
+            break
+        except Exception as e:
+            mark_failed_attempt(email, e)
+            failed += 1
+    for email in released:
+        email.next_attempt_at = timezone.now()
+    if emails:
+        OutboxEmail.objects.bulk_update(
+            emails, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+    return sent, failed, len(released)
+
+
+def dispatch_outbox(batch_size=EMAIL_OUTBOX_BATCH_SIZE):
+    """
+    Drain every due message, reusing a single SMTP connection for all batches.
+    Stops early when the connection is lost. Returns (sent, failed) totals.
+    """
+    total_sent = total_failed = 0
+    if not OutboxEmail.objects.filter(status="pending", next_attempt_at__lte=timezone.now()).exists():
+        return total_sent, total_failed
+
+    connection = get_connection()
+    try:
+        connection.open()
+        while True:
+            sent, failed, released = send_outbox_batch(connection, batch_size)
+            total_sent += sent
+            total_failed += failed
+            if released or sent + failed < batch_size:
+                break
+    finally:
+        connection.close()
+    return total_sent, total_failed
+
+
+def run_email_dispatcher(interval=EMAIL_DISPATCH_INTERVAL, once=False):
+    """
+    Dispatch outbox emails forever (or once), polling every `interval` seconds.
+    """
+    while True:
+        # A long-lived worker never finishes a request, so drop stale or broken
+        # connections (CONN_MAX_AGE, server restarts) around every poll.
+        close_old_connections()
+        try:
+            sent, failed = dispatch_outbox()
+            if sent or failed:
+                print(f"Sent {sent} emails, {failed} failed.")
+        except Exception as e:
+            if once:
+                raise
+            print(f"Error dispatching emails: {str(e)}")
+        finally:
+            close_old_connections()
+        if once:
+            return
+        time.sleep(interval)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import User, InstaPost, InstaStats
+from django.db import transaction
+from .models import User, InstaPost, InstaStats, upsert_insta_posts
 import json
 
 class UserSerializer(serializers.ModelSerializer):
@@ -136,14 +137,15 @@ class InstaStatsSerializer(serializers.ModelSerializer):
             'following', 'posts_count', 'posts'
         ]
 
+    @transaction.atomic
     def create(self, validated_data):
         posts_data = validated_data.pop('posts', [])
         insta_stats = InstaStats.objects.create(**validated_data)
 
-        for post_data in posts_data:
-            InstaPost.objects.create(insta_stats=insta_stats, **post_data)
+        upsert_insta_posts(insta_stats, [(post['post_number'], post['post_detail']) for post in posts_data])
         return insta_stats
     
+    @transaction.atomic
     def update(self, instance, validated_data):
         posts_data = validated_data.pop('posts', None)
         
@@ -152,9 +154,7 @@ class InstaStatsSerializer(serializers.ModelSerializer):
         instance.save()
         
         if posts_data is not None:
-            # Option: Clear out all existing posts and add the new ones.
-            instance.posts.all().delete()
-            for post_data in posts_data:
-                InstaPost.objects.create(insta_stats=instance, **post_data)
+            # The new posts replace the stored set: matching numbers are updated, the rest removed.
+            upsert_insta_posts(instance, [(post['post_number'], post['post_detail']) for post in posts_data])
                 
         return instance
\ No newline at end of file
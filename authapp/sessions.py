@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+# Unmodified sessions are written back at most once per interval. Expiry still
+# slides with activity, to within this many seconds of SESSION_COOKIE_AGE.
+SESSION_REFRESH_INTERVAL = getattr(settings, 'SESSION_REFRESH_INTERVAL', 60)
+REFRESHED_AT_KEY = '_session_refreshed_at'
+
+
+class SessionStore(CachedDBStore):
+    """
+    Cache-first, database-backed sessions that skip the per-request write
+    SESSION_SAVE_EVERY_REQUEST would cause. A session whose data did not
+    change is only saved (renewing its expiry in the cache and the database)
+    once its last save is older than SESSION_REFRESH_INTERVAL.
+    """
+
+    def needs_refresh(self):
+        refreshed_at = self._get_session().get(REFRESHED_AT_KEY)
+        return refreshed_at is None or time.time() - refreshed_at >= SESSION_REFRESH_INTERVAL
+
+    def save(self, must_create=False):
+        if not must_create and not self.modified and self.session_key and not self.needs_refresh():
+            return
+        # Written straight into the loaded data so it does not mark the session as modified.
+        self._get_session(no_load=must_create)[REFRESHED_AT_KEY] = time.time()
+        super().save(must_create)
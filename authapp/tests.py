@@ -0,0 +1,181 @@
+import io
+import os
+import smtplib
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import CachedTokenAuthentication, auth_cache, token_cache_key
+from .models import OutboxEmail, User, OTP
+from .otp import issue_otp, verify_otp, OTP_MAX_ATTEMPTS
+from .outbox import enqueue_email, dispatch_outbox
+
+
+class FlakyEmailBackend(locmem.EmailBackend):
+    """
+    Local SMTP stand-in: counts opened connections, drops the session after
+    `drop_after` messages like a server closing a busy connection, refuses
+    the recipients in `refused`, and stops accepting connections after
+    `max_opens`.
+    """
+    opened = 0
+    drop_after = None
+    max_opens = None
+    refused = ()
+
+    def open(self):
+        if self.max_opens is not None and FlakyEmailBackend.opened >= self.max_opens:
+            raise ConnectionRefusedError("Connection refused")
+        FlakyEmailBackend.opened += 1
+        self.live = True
+        self.sent_on_connection = 0
+        return True
+
+    def close(self):
+        self.live = False
+
+    def send_messages(self, messages):
+        for message in messages:
+            if not getattr(self, 'live', False):
+                raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+            if self.drop_after is not None and self.sent_on_connection >= self.drop_after:
+                self.live = False
+                raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+            refused = {address: (550, b"User unknown") for address in message.to if address in self.refused}
+            if refused:
+                raise smtplib.SMTPRecipientsRefused(refused)
+            self.sent_on_connection += 1
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='authapp.tests.FlakyEmailBackend')
+class OutboxDispatchTests(TestCase):
+    def setUp(self):
+        FlakyEmailBackend.opened = 0
+        FlakyEmailBackend.drop_after = None
+        FlakyEmailBackend.max_opens = None
+        FlakyEmailBackend.refused = ()
+
+    def enqueue(self, count, recipient='user{}@example.com'):
+        for i in range(count):
+            enqueue_email(f"Subject {i}", "Body", "noreply@example.com", [recipient.format(i)])
+
+    def test_batches_share_one_connection(self):
+        self.enqueue(5)
+        self.assertEqual(dispatch_outbox(batch_size=2), (5, 0))
+        self.assertEqual(FlakyEmailBackend.opened, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(OutboxEmail.objects.filter(status="sent").count(), 5)
+
+    def test_dropped_connection_is_reopened_without_charging_attempts(self):
+        FlakyEmailBackend.drop_after = 2
+        self.enqueue(5)
+        self.assertEqual(dispatch_outbox(batch_size=2), (5, 0))
+        self.assertEqual(FlakyEmailBackend.opened, 3)
+        self.assertFalse(OutboxEmail.objects.exclude(attempts=0).exists())
+
+    def test_lost_connection_releases_the_rest_uncharged(self):
+        FlakyEmailBackend.drop_after = 1
+        FlakyEmailBackend.max_opens = 1
+        self.enqueue(5)
+        self.assertEqual(dispatch_outbox(batch_size=2), (1, 0))
+        self.assertEqual(OutboxEmail.objects.filter(status="sent").count(), 1)
+        pending = OutboxEmail.objects.filter(status="pending")
+        self.assertEqual(pending.count(), 4)
+        self.assertFalse(pending.exclude(attempts=0).exists())
+        self.assertFalse(pending.filter(next_attempt_at__gt=timezone.now()).exists())
+
+    @mock.patch('authapp.outbox.EMAIL_OUTBOX_MAX_ATTEMPTS', 2)
+    def test_refused_message_is_retried_then_marked_failed(self):
+        FlakyEmailBackend.refused = ('bad@example.com',)
+        self.enqueue(1, recipient='bad@example.com')
+        self.enqueue(1)
+
+        self.assertEqual(dispatch_outbox(), (1, 1))
+        email = OutboxEmail.objects.get(recipients=['bad@example.com'])
+        self.assertEqual((email.status, email.attempts), ("pending", 1))
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertEqual(dispatch_outbox(), (0, 0))
+
+        OutboxEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(dispatch_outbox(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ("failed", 2))
+        self.assertIn("User unknown", email.last_error)
+
+
+class OTPTests(TestCase):
+    # The test cache is not Redis, so codes and attempt counts live in the OTP table.
+    def setUp(self):
+        self.user = User.objects.create_user(email='otp@example.com', password='secret')
+
+    def test_attempts_are_capped(self):
+        code = issue_otp(self.user)
+        wrong = '000000' if code != '000000' else '111111'
+        for _ in range(OTP_MAX_ATTEMPTS):
+            self.assertIs(verify_otp(self.user, wrong), False)
+        self.assertIsNone(verify_otp(self.user, code))
+        self.assertEqual(OTP.objects.get().attempts, OTP_MAX_ATTEMPTS)
+
+    def test_code_is_single_use(self):
+        code = issue_otp(self.user)
+        self.assertIs(verify_otp(self.user, code), True)
+        self.assertIsNone(verify_otp(self.user, code))
+
+    def test_non_ascii_code_is_rejected(self):
+        issue_otp(self.user)
+        self.assertIs(verify_otp(self.user, '١٢٣٤٥٦'), False)
+
+
+class ImportUsersTests(TestCase):
+    def import_csv(self, content):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(content)
+        self.addCleanup(os.remove, f.name)
+        call_command('import_users', f.name, stdout=io.StringIO())
+
+    def test_generated_username_avoids_names_requested_in_the_same_batch(self):
+        self.import_csv("email,username\nalice@x.com,john\njohn@y.com,\n")
+        self.assertEqual(User.objects.get(email='alice@x.com').username, 'john')
+        generated = User.objects.get(email='john@y.com').username
+        self.assertNotEqual(generated, 'john')
+        self.assertTrue(generated.startswith('john_'))
+
+    def test_taken_username_is_replaced(self):
+        User.objects.create_user(email='first@x.com', username='taken', password='secret')
+        self.import_csv("email,username\nsecond@x.com,taken\n")
+        self.assertNotEqual(User.objects.get(email='second@x.com').username, 'taken')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='token@example.com', password='secret')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_only_the_user_id_is_cached(self):
+        self.assertEqual(self.auth.authenticate_credentials(self.token.key), (self.user, self.token))
+        self.assertEqual(auth_cache.get(token_cache_key(self.token.key)), self.user.pk)
+        user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual((user, token.key), (self.user, self.token.key))
+
+    def test_deactivated_user_is_rejected_despite_cache(self):
+        self.auth.authenticate_credentials(self.token.key)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_deleted_token_is_dropped_from_cache(self):
+        self.auth.authenticate_credentials(self.token.key)
+        Token.objects.filter(user=self.user).delete()
+        self.assertIsNone(auth_cache.get(token_cache_key(self.token.key)))
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
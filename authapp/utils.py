@@ -1,42 +1,15 @@
 import os
 import re
-import http.client
 import json
-import time
-import threading
 from dotenv import load_dotenv
-from .models import InstaStats, InstaPost
+from django.db import transaction
+from .models import InstaStats, create_insta_posts
 from urllib.parse import urlparse
+from backend.rocketapi import get_client, DEVELOPERS_HOST, GET_INFO_PATH, GET_MEDIA_PATH
+from backend.rocketapi_cache import cached_post
 
 load_dotenv()
 
-# Rate limiter as provided
-class RateLimiter:
-    def __init__(self, rate, per):
-        self.rate = rate
-        self.per = per
-        self.allowance = rate
-        self.last_check = time.time()
-        self.lock = threading.Lock()
-
-    def wait(self):
-        with self.lock:
-            current = time.time()
-            time_passed = current - self.last_check
-            self.last_check = current
-            self.allowance += time_passed * (self.rate / self.per)
-            if self.allowance > self.rate:
-                self.allowance = self.rate
-            if self.allowance < 1.0:
-                sleep_time = (1.0 - self.allowance) * (self.per / self.rate)
-                time.sleep(sleep_time)
-                self.allowance = 0
-            else:
-                self.allowance -= 1.0
-
-# Global rate limiter: 8 requests per second
-rate_limiter = RateLimiter(rate=8, per=1)
-
 def extract_instagram_username(insta_url: str) -> str:
     try: 
         parsed_url = urlparse(insta_url)
@@ -54,25 +27,12 @@ def fetch_instagram_user_data(username: str, api_key: str):
     Endpoint: https://rocketapi-for-developers.p.rapidapi.com/instagram/user/get_info
     """
     try:
-        rate_limiter.wait()
-        conn = http.client.HTTPSConnection("rocketapi-for-developers.p.rapidapi.com")
-        headers = {
-            "x-rapidapi-key": api_key,
-            "x-rapidapi-host": "rocketapi-for-developers.p.rapidapi.com",
-            "Content-Type": "application/json"
-        }
-        payload = json.dumps({"username": username})
-        # Updated endpoint for user info
-        conn.request("POST", "/instagram/user/get_info", body=payload, headers=headers)
-        response = conn.getresponse()
-        response_data = response.read().decode("utf-8")
-        try:
-            json_data = json.loads(response_data)
-        except json.JSONDecodeError:
-            print(f"Error: Invalid JSON response for {username}: {response_data}")
+        status, json_data = cached_post(get_client(DEVELOPERS_HOST), GET_INFO_PATH, {"username": username}, api_key)
+        if json_data is None:
+            print(f"Error: Invalid JSON response for {username} (status {status})")
             return None
-        if response.status != 200:
-            print(f"Error {response.status} for {username}: {json_data}")
+        if status != 200:
+            print(f"Error {status} for {username}: {json_data}")
             return None
         return json_data
     except Exception as e:
@@ -117,25 +77,14 @@ def fetch_instagram_user_media(user_id: int, api_key: str, followers: int):
     try:
         if not user_id:
             return []
-        rate_limiter.wait()
-        conn = http.client.HTTPSConnection("rocketapi-for-developers.p.rapidapi.com")
-        headers = {
-            "x-rapidapi-key": api_key,
-            "x-rapidapi-host": "rocketapi-for-developers.p.rapidapi.com",
-            "Content-Type": "application/json"
-        }
         # Updated payload: count set to 12 and max_id set to None as per sample
-        payload = json.dumps({"id": user_id, "count": 12, "max_id": None})
-        conn.request("POST", "/instagram/user/get_media", body=payload, headers=headers)
-        response = conn.getresponse()
-        response_data = response.read().decode("utf-8")
-        try:
-            json_data = json.loads(response_data)
-        except json.JSONDecodeError:
-            print(f"Error: Invalid JSON response for user_id {user_id}: {response_data}")
+        payload = {"id": user_id, "count": 12, "max_id": None}
+        status, json_data = cached_post(get_client(DEVELOPERS_HOST), GET_MEDIA_PATH, payload, api_key)
+        if json_data is None:
+            print(f"Error: Invalid JSON response for user_id {user_id} (status {status})")
             return []
-        if response.status != 200:
-            print(f"Error {response.status} for user_id {user_id}: {json_data}")
+        if status != 200:
+            print(f"Error {status} for user_id {user_id}: {json_data}")
             return []
         media_data = json_data.get("response", {}).get("body", {}).get("items", [])
         media_details_list = []
@@ -194,16 +143,9 @@ def update_insta_stats_for_username(insta_username: str):
         "following": relevant_data.get("following"),
         "posts_count": relevant_data.get("posts_count")
     }
-    insta_stats, _ = InstaStats.objects.update_or_create(insta_id=insta_id, defaults=defaults)
-    # Remove any existing posts for this InstaStats instance
-    insta_stats.posts.all().delete()
-    # Create up to 12 InstaPost records
     media_details = relevant_data.get("media_details", [])
-    for i in range(1, 13):
-        post_detail = media_details[i-1] if i-1 < len(media_details) else {}
-        InstaPost.objects.create(
-            insta_stats=insta_stats,
-            post_number=i,
-            post_detail=post_detail
-        )
+    # Stats and all 12 posts change together, so readers never see a half-written set.
+    with transaction.atomic():
+        insta_stats, _ = InstaStats.objects.update_or_create(insta_id=insta_id, defaults=defaults)
+        create_insta_posts(insta_stats, media_details)
     return {"insta_stats": insta_stats, "media_count": len(media_details)}
@@ -1,25 +1,26 @@
 import numpy as np
 from django.contrib.auth import get_user_model, login, logout
 from django.utils.decorators import method_decorator
-from django.core.mail import send_mail
+from django.db import transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from .serializers import RegistrationSerializer, LoginSerializer, ProfileUpdateSerializer
-from .models import OTP, InstaStats, InstaPost
+from .models import InstaStats, InstaPost
 from .utils import extract_instagram_username, update_insta_stats_for_username
 from authapp.serializers import UserSerializer
 from django_ratelimit.decorators  import ratelimit
 from rest_framework.permissions import AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 
-from rest_framework.authentication import TokenAuthentication
+from .authentication import CachedTokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
 User = get_user_model()
 
-from django.core.mail import send_mail
+from .outbox import enqueue_email
+from .otp import issue_otp, verify_otp
 
 class RegisterUser(APIView):
     permission_classes = [AllowAny]
@@ -27,16 +28,16 @@ class RegisterUser(APIView):
     def post(self, request):
         serializer = RegistrationSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
-
-            # Send welcome email
-            send_mail(
-                'Welcome to InfluenceHub!',
-                f'Hi {user.username},\n\nWelcome to InfluenceHub! We are excited to have you on board.\n\nFeel free to explore and connect with the community.\n\nBest Regards,\nThe InfluenceHub Team',
-                'no-reply@influenceHub.com',
-                [user.email],
-                fail_silently=False,
-            )
+            with transaction.atomic():
+                user = serializer.save()
+
+                # Queue the welcome email; the dispatcher sends it once the user is committed.
+                enqueue_email(
+                    'Welcome to InfluenceHub!',
+                    f'Hi {user.username},\n\nWelcome to InfluenceHub! We are excited to have you on board.\n\nFeel free to explore and connect with the community.\n\nBest Regards,\nThe InfluenceHub Team',
+                    'no-reply@influenceHub.com',
+                    [user.email],
+                )
 
             return Response({"message": "Registration successful. A welcome email has been sent."}, status=status.HTTP_201_CREATED)
         
@@ -80,16 +81,15 @@ class LoginUser(APIView):
         if serializer.is_valid():
             user = serializer.validated_data['user']
 
-            otp = OTP.objects.create(user=user)
-            otp_code = otp.generate_otp()
-            
-            send_mail(
-                'Your 2FA code ',
-                'Your 2FA code is {}'.format(otp_code),
-                'no-reply@influenceHub.com',
-                [user.email],
-                fail_silently=False,
-            )
+            with transaction.atomic():
+                otp_code = issue_otp(user)
+
+                enqueue_email(
+                    'Your 2FA code ',
+                    'Your 2FA code is {}'.format(otp_code),
+                    'no-reply@influenceHub.com',
+                    [user.email],
+                )
             return Response({"message": "OTP sent to your email."}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -107,19 +107,13 @@ class VerifyOTP(APIView):
         try:
             user = User.objects.get(email=email)
             
-            # Fetch the latest non-expired OTP for the user
-            otp = OTP.objects.filter(user=user, expired=False).order_by('-timestamp').first()
+            # Codes are single use and limited to a few attempts.
+            verified = verify_otp(user, otp_code)
 
-            if not otp or otp.is_expired():
-                if otp:
-                    otp.expired = True
-                    otp.save(update_fields=["expired"])
+            if verified is None:
                 return Response({"error": "OTP has expired."}, status=status.HTTP_400_BAD_REQUEST)
 
-            if otp.code == otp_code:
-                otp.expired = True
-                otp.save(update_fields=["expired"])
-
+            if verified:
                 # If the action is login, authenticate the user
                 if action == "login":
                     login(request, user)
@@ -160,22 +154,17 @@ class ResetOTP(APIView):
             if not user:
                 return Response({"error": "User not found."}, status=status.HTTP_404_NOT_FOUND)
 
-            # Expire any existing OTPs
-            OTP.objects.filter(user=user, expired=False).update(expired=True)
-
-            # Generate a new OTP
-            new_otp = OTP.objects.create(user=user)
-            otp_code = new_otp.generate_otp()  
-            new_otp.save()
-
-            # Send email with the new OTP
-            send_mail(
-                'Your New OTP Code',
-                f'Your new OTP code is {otp_code}',
-                'no-reply@influenceHub.com',
-                [user.email],
-                fail_silently=False,
-            )
+            with transaction.atomic():
+                # Generate a new OTP, replacing any existing one
+                otp_code = issue_otp(user)
+
+                # Queue the email with the new OTP
+                enqueue_email(
+                    'Your New OTP Code',
+                    f'Your new OTP code is {otp_code}',
+                    'no-reply@influenceHub.com',
+                    [user.email],
+                )
             
             return Response({"message": "A new OTP has been sent to your email."}, status=status.HTTP_200_OK)
 
@@ -190,16 +179,15 @@ class ForgotPassword(APIView):
         try:
             user = User.objects.get(email=email)
             
-            otp = OTP.objects.create(user=user)
-            otp_code = otp.generate_otp()
-            
-            send_mail(
-                'Your Password Reset Code',
-                'Your Password reset code is {}'.format(otp_code),
-                'no-reply@influenceHub.com',
-                [user.email],
-                fail_silently=False,
-            )           
+            with transaction.atomic():
+                otp_code = issue_otp(user)
+
+                enqueue_email(
+                    'Your Password Reset Code',
+                    'Your Password reset code is {}'.format(otp_code),
+                    'no-reply@influenceHub.com',
+                    [user.email],
+                )
             return Response({"message": "OTP sent to your email."}, status=status.HTTP_200_OK)
         
         except User.DoesNotExist:
@@ -236,11 +224,11 @@ class ResetPassword(APIView):
             return Response({"error": "User not found."}, status=status.HTTP_404_NOT_FOUND)
  
 class LogoutUser(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        # Delete the user's authentication token
+        # Delete the user's authentication token; its cached lookup is dropped by a post_delete signal
         Token.objects.filter(user=request.user).delete()
 
         # Log the user out
@@ -0,0 +1,136 @@
+import time
+import threading
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+
+# Hit/miss counts are buffered per process and added to the shared totals at most this often.
+CACHE_METRICS_FLUSH_INTERVAL = 30
+METRICS_KEY = 'metrics:cache:{}:{}'
+
+_missing = object()
+_namespaces = {}
+_pending = Counter()
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def _record(namespace, hits, misses):
+    """
+    Buffer one read's counts. Returns the buffered counts once they are due to
+    be flushed, leaving the (blocking) flush to the caller.
+    """
+    global _last_flush
+    with _pending_lock:
+        _pending[(namespace, 'hits')] += hits
+        _pending[(namespace, 'misses')] += misses
+        if time.monotonic() - _last_flush < CACHE_METRICS_FLUSH_INTERVAL:
+            return None
+        counts = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    return counts
+
+
+def flush_metrics(counts):
+    cache = caches['default']
+    for (namespace, kind), value in counts.items():
+        if not value:
+            continue
+        key = METRICS_KEY.format(namespace, kind)
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            # Evicted between add() and incr(); these counts are best-effort.
+            pass
+
+
+def cache_metrics():
+    """
+    Shared hit/miss totals per namespace, across every process using the cache.
+    """
+    keys = {
+        METRICS_KEY.format(name, kind): (name, kind)
+        for name in _namespaces for kind in ('hits', 'misses')
+    }
+    found = caches['default'].get_many(list(keys))
+    metrics = {name: {'hits': 0, 'misses': 0} for name in _namespaces}
+    for key, value in found.items():
+        name, kind = keys[key]
+        metrics[name][kind] = value
+    for counts in metrics.values():
+        total = counts['hits'] + counts['misses']
+        counts['hit_ratio'] = round(counts['hits'] / total, 4) if total else None
+    return metrics
+
+
+class CacheNamespace:
+    """
+    One subsystem's slice of a shared cache. Keys are prefixed with the
+    namespace (and a version when given), and reads are counted as hits or
+    misses for cache_metrics().
+    """
+
+    def __init__(self, name, alias='default'):
+        self.name = name
+        self.alias = alias
+        _namespaces[name] = self
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def make_key(self, key, version=None):
+        if version is None:
+            return f'{self.name}:{key}'
+        return f'{self.name}:{key}:v{version}'
+
+    def get(self, key, default=None, version=None):
+        value = self.cache.get(self.make_key(key, version), _missing)
+        hit = value is not _missing
+        counts = _record(self.name, int(hit), int(not hit))
+        if counts:
+            flush_metrics(counts)
+        return value if hit else default
+
+    async def aget(self, key, default=None, version=None):
+        value = await self.cache.aget(self.make_key(key, version), _missing)
+        hit = value is not _missing
+        counts = _record(self.name, int(hit), int(not hit))
+        if counts:
+            # Keep the synchronous cache round trips off the event loop.
+            await sync_to_async(flush_metrics, thread_sensitive=False)(counts)
+        return value if hit else default
+
+    def get_many(self, keys, version=None):
+        full_keys = {self.make_key(key, version): key for key in keys}
+        found = self.cache.get_many(list(full_keys))
+        counts = _record(self.name, len(found), len(full_keys) - len(found))
+        if counts:
+            flush_metrics(counts)
+        return {full_keys[key]: value for key, value in found.items()}
+
+    async def aget_many(self, keys, version=None):
+        full_keys = {self.make_key(key, version): key for key in keys}
+        found = await self.cache.aget_many(list(full_keys))
+        counts = _record(self.name, len(found), len(full_keys) - len(found))
+        if counts:
+            await sync_to_async(flush_metrics, thread_sensitive=False)(counts)
+        return {full_keys[key]: value for key, value in found.items()}
+
+    def set(self, key, value, timeout, version=None):
+        self.cache.set(self.make_key(key, version), value, timeout)
+
+    def add(self, key, value, timeout, version=None):
+        return self.cache.add(self.make_key(key, version), value, timeout)
+
+    def incr(self, key, delta=1, version=None):
+        return self.cache.incr(self.make_key(key, version), delta)
+
+    def delete(self, key, version=None):
+        return self.cache.delete(self.make_key(key, version))
+
+    def delete_many(self, keys, version=None):
+        self.cache.delete_many([self.make_key(key, version) for key in keys])
@@ -0,0 +1,296 @@
+import os
+import time
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+# Shared HTTP client for every RocketAPI (Instagram) caller: the authapp profile
+# refresh and the brands_insightapp scraper scripts. Plain Python, no Django
+# imports, so the standalone scripts can use it too.
+
+DEVELOPERS_HOST = "rocketapi-for-developers.p.rapidapi.com"
+INSTAGRAM_HOST = "rocketapi-for-instagram.p.rapidapi.com"
+GET_INFO_PATH = "/instagram/user/get_info"
+GET_MEDIA_PATH = "/instagram/user/get_media"
+
+ROCKETAPI_CONNECT_TIMEOUT = float(os.getenv('ROCKETAPI_CONNECT_TIMEOUT', 5))
+ROCKETAPI_READ_TIMEOUT = float(os.getenv('ROCKETAPI_READ_TIMEOUT', 30))
+ROCKETAPI_POOL_SIZE = int(os.getenv('ROCKETAPI_POOL_SIZE', 16))
+ROCKETAPI_RATE_LIMIT = float(os.getenv('ROCKETAPI_RATE_LIMIT', 8))
+# AIMD tuning: halve the rate on a 429, then recover by a small step per success.
+RATE_DECREASE_FACTOR = 0.5
+RATE_DECREASE_COOLDOWN = 1.0
+RATE_INCREASE_STEP = 0.05
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket with an asyncio variant. Each caller reserves its
+    slot under the lock and sleeps outside it, so waiters never queue behind a
+    sleeping thread.
+
+    The rate adapts to the upstream quota (AIMD): a 429 halves it (at most once
+    per cooldown) and pauses everyone for Retry-After; every success adds a
+    small step back, up to max_rate.
+    """
+
+    def __init__(self, rate, per, min_rate=None, max_rate=None):
+        self.rate = rate / per                      # current requests per second
+        self.min_rate = (min_rate or rate / 8) / per
+        self.max_rate = (max_rate or rate) / per
+        self.capacity = max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.last_check = time.monotonic()
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.waiting = 0
+        self.lock = threading.Lock()
+
+    def refill(self, current):
+        # Called under the lock, and before every rate change so elapsed time is credited at the old rate.
+        self.tokens = min(self.capacity, self.tokens + (current - self.last_check) * self.rate)
+        self.last_check = current
+
+    def reserve(self):
+        """
+        Take the next slot and return how long the caller must sleep for it.
+        """
+        with self.lock:
+            current = time.monotonic()
+            self.refill(current)
+            self.tokens -= 1.0
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            delay = max(delay, self.blocked_until - current)
+            if delay > 0:
+                self.waiting += 1
+            return delay
+
+    def release_waiter(self):
+        with self.lock:
+            self.waiting -= 1
+
+    def wait(self):
+        delay = self.reserve()
+        if delay > 0:
+            try:
+                time.sleep(delay)
+            finally:
+                self.release_waiter()
+
+    async def wait_async(self):
+        delay = self.reserve()
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self.release_waiter()
+
+    def on_response(self, status, retry_after=None):
+        """
+        Feed an upstream status back into the rate: multiplicative decrease on
+        429, additive increase on success.
+        """
+        with self.lock:
+            current = time.monotonic()
+            self.refill(current)
+            if status == 429:
+                if retry_after:
+                    self.blocked_until = max(self.blocked_until, current + retry_after)
+                # One burst of 429s from in-flight requests counts as a single signal.
+                if current - self.last_decrease >= RATE_DECREASE_COOLDOWN:
+                    self.rate = max(self.min_rate, self.rate * RATE_DECREASE_FACTOR)
+                    self.last_decrease = current
+                    self.tokens = min(self.tokens, 0.0)
+            elif status < 400:
+                self.rate = min(self.max_rate, self.rate + RATE_INCREASE_STEP)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'rate_per_second': round(self.rate, 3),
+                'max_rate_per_second': round(self.max_rate, 3),
+                'queue_depth': self.waiting,
+                'blocked_for_seconds': round(max(0.0, self.blocked_until - time.monotonic()), 3),
+            }
+
+
+def parse_retry_after(value):
+    """
+    Seconds to wait from a Retry-After header (delta-seconds or HTTP date).
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+# One budget for every RocketAPI call in the process: up to 8 requests per second.
+rate_limiter = RateLimiter(rate=ROCKETAPI_RATE_LIMIT, per=1)
+
+
+class EndpointStats:
+    """
+    Request, error and latency counters for one (host, path) endpoint.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record(self, latency, error):
+        with self.lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'avg_latency_ms': round(self.total_latency / self.requests * 1000, 1) if self.requests else None,
+                'max_latency_ms': round(self.max_latency * 1000, 1),
+            }
+
+
+_endpoint_stats = {}
+_endpoint_stats_lock = threading.Lock()
+
+
+def endpoint_stats(host, path):
+    key = f'{host}{path}'
+    with _endpoint_stats_lock:
+        if key not in _endpoint_stats:
+            _endpoint_stats[key] = EndpointStats()
+        return _endpoint_stats[key]
+
+
+def endpoint_metrics():
+    with _endpoint_stats_lock:
+        stats = dict(_endpoint_stats)
+    return {
+        'rate_limiter': rate_limiter.snapshot(),
+        'endpoints': {key: value.snapshot() for key, value in stats.items()},
+    }
+
+
+class RocketAPIClient:
+    """
+    Keep-alive, pooled client for one RocketAPI host. Requests share the TCP/TLS
+    connections of a single requests.Session, ask for gzip, time out instead of
+    hanging, and wait on the shared rate limiter.
+    """
+
+    def __init__(self, host, limiter=rate_limiter):
+        self.host = host
+        self.limiter = limiter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=ROCKETAPI_POOL_SIZE)
+        self.session.mount(f'https://{host}', adapter)
+        self.session.headers.update({
+            "x-rapidapi-host": host,
+            "Content-Type": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+        })
+
+    def post(self, path, payload, api_key):
+        """
+        POST a JSON payload. Returns (status, data); data is None when the body
+        is not JSON. Network errors propagate to the caller.
+        """
+        self.limiter.wait()
+        stats = endpoint_stats(self.host, path)
+        started = time.monotonic()
+        try:
+            response = self.session.post(
+                f'https://{self.host}{path}',
+                json=payload,
+                headers={"x-rapidapi-key": api_key or ""},
+                timeout=(ROCKETAPI_CONNECT_TIMEOUT, ROCKETAPI_READ_TIMEOUT),
+            )
+        except requests.RequestException:
+            stats.record(time.monotonic() - started, error=True)
+            raise
+        self.limiter.on_response(response.status_code, parse_retry_after(response.headers.get('Retry-After')))
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        stats.record(time.monotonic() - started, error=response.status_code != 200 or data is None)
+        return response.status_code, data
+
+
+class AsyncRocketAPIClient:
+    """
+    asyncio counterpart of RocketAPIClient for batch jobs: one aiohttp session
+    with a keep-alive pool of `concurrency` connections, sharing the process
+    rate limiter and endpoint counters. Use as an async context manager.
+    """
+
+    def __init__(self, host, concurrency=ROCKETAPI_POOL_SIZE, limiter=rate_limiter):
+        self.host = host
+        self.concurrency = concurrency
+        self.limiter = limiter
+        self.session = None
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=75),
+            timeout=aiohttp.ClientTimeout(sock_connect=ROCKETAPI_CONNECT_TIMEOUT, sock_read=ROCKETAPI_READ_TIMEOUT),
+            headers={"x-rapidapi-host": self.host, "Accept-Encoding": "gzip, deflate"},
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    async def post(self, path, payload, api_key):
+        """
+        Same contract as RocketAPIClient.post: returns (status, data).
+        """
+        await self.limiter.wait_async()
+        stats = endpoint_stats(self.host, path)
+        started = time.monotonic()
+        try:
+            async with self.session.post(
+                f'https://{self.host}{path}', json=payload, headers={"x-rapidapi-key": api_key or ""}
+            ) as response:
+                status = response.status
+                retry_after = response.headers.get('Retry-After')
+                try:
+                    data = await response.json(content_type=None)
+                except ValueError:
+                    data = None
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            stats.record(time.monotonic() - started, error=True)
+            raise
+        self.limiter.on_response(status, parse_retry_after(retry_after))
+        stats.record(time.monotonic() - started, error=status != 200 or data is None)
+        return status, data
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(host):
+    """
+    The process-wide client for a host, created on first use.
+    """
+    with _clients_lock:
+        if host not in _clients:
+            _clients[host] = RocketAPIClient(host)
+        return _clients[host]
@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import Future
+
+from backend.cache import CacheNamespace
+
+# Raw RocketAPI responses, shared by every worker through the default cache
+# (Redis when configured, otherwise the on-disk file cache). Kept apart from
+# backend.rocketapi so the standalone scraper scripts stay free of Django.
+
+rocketapi_cache = CacheNamespace('rocketapi')
+ROCKETAPI_CACHE_TTL = int(os.getenv('ROCKETAPI_CACHE_TTL', 300))
+# How long another worker's in-flight fetch is waited for before fetching anyway.
+ROCKETAPI_FETCH_LOCK_TIMEOUT = int(os.getenv('ROCKETAPI_FETCH_LOCK_TIMEOUT', 30))
+ROCKETAPI_FETCH_POLL_INTERVAL = 0.1
+
+
+def response_key(host, path, payload):
+    raw = json.dumps([host, path, payload], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key within this process: the first
+    caller runs the function, the others wait for and share its result.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Future()
+        if not leader:
+            return call.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+
+_flights = SingleFlight()
+
+
+def cached_post(client, path, payload, api_key):
+    """
+    RocketAPIClient.post with a TTL cache in front of it. Successful responses
+    are served from the cache for ROCKETAPI_CACHE_TTL seconds, and concurrent
+    misses for the same request, in this process or another worker, share one
+    upstream call. Returns (status, data) like client.post.
+    """
+    key = response_key(client.host, path, payload)
+    try:
+        data = rocketapi_cache.get(key)
+    except Exception as e:
+        print(f"RocketAPI cache unavailable, calling the API directly: {str(e)}")
+        return client.post(path, payload, api_key)
+    if data is not None:
+        return 200, data
+    return _flights.do(key, lambda: fetch_shared(client, path, payload, api_key, key))
+
+
+def fetch_shared(client, path, payload, api_key, key):
+    """
+    Fetch one response on behalf of every worker. A short cache lock marks the
+    fetch as in flight; workers that lose the race poll for the winner's result.
+    """
+    lock_key = f'lock:{key}'
+    try:
+        owner = rocketapi_cache.add(lock_key, 1, ROCKETAPI_FETCH_LOCK_TIMEOUT)
+    except Exception as e:
+        print(f"RocketAPI cache lock failed, calling the API directly: {str(e)}")
+        return client.post(path, payload, api_key)
+
+    if not owner:
+        deadline = time.monotonic() + ROCKETAPI_FETCH_LOCK_TIMEOUT
+        cache = rocketapi_cache.cache
+        while time.monotonic() < deadline:
+            time.sleep(ROCKETAPI_FETCH_POLL_INTERVAL)
+            # Raw reads so polling does not count as cache misses.
+            data = cache.get(rocketapi_cache.make_key(key))
+            if data is not None:
+                return 200, data
+            if cache.get(rocketapi_cache.make_key(lock_key)) is None:
+                # The other fetch failed; its error response was not cached.
+                break
+
+    try:
+        status, data = client.post(path, payload, api_key)
+        if status == 200 and data is not None:
+            rocketapi_cache.set(key, data, ROCKETAPI_CACHE_TTL)
+        return status, data
+    finally:
+        if owner:
+            try:
+                rocketapi_cache.delete(lock_key)
+            except Exception as e:
+                print(f"Failed to release RocketAPI cache lock: {str(e)}")
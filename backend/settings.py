@@ -71,7 +71,7 @@ TEMPLATES = [
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'authapp.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -118,7 +118,10 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'authapp.User'
 
 # Email backend settings
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Emails are queued in the outbox and sent by `manage.py dispatch_emails`. For local
+# runs point EMAIL_BACKEND at django.core.mail.backends.locmem.EmailBackend, or at a
+# stand-in server (`python -m aiosmtpd -n -l localhost:1025` with EMAIL_USE_TLS=False).
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')         # SMTP server (example: Gmail's SMTP)
 EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))                   # SMTP port (example: 587 for TLS)
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'       # Enable TLS
@@ -127,15 +130,59 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')           # Your email pa
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', EMAIL_HOST_USER)
 FRONTEND_URL = os.getenv('FRONTEND_URL')
 
+# Trend ranking: a post's "hot" score halves every TREND_HOT_HALF_LIFE_HOURS hours.
+TREND_HOT_HALF_LIFE_HOURS = float(os.getenv('TREND_HOT_HALF_LIFE_HOURS', 6))
+
+# Cache settings
+# Shared by every worker. 'default' holds the bulk entries (trend listings, events,
+# RocketAPI responses); 'auth' holds the small, hot per-request ones (sessions,
+# token lookups, OTP codes, rate-limit counters), so bulk churn never evicts them.
+# Use a Redis-compatible server when REDIS_URL is set; otherwise fall back to
+# file-based caches, which are shared by all workers on a single host.
+#
+# The file fallback is for development and single-host setups only: its incr() is a
+# non-atomic get+set, so rate-limit counters undercount under concurrent requests, and
+# once MAX_ENTRIES is reached every set() lists the whole cache directory to cull it
+# (randomly dropping a third of the entries). Set REDIS_URL in production.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        alias: {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'influencehub',
+        }
+        for alias in ('default', 'auth')
+    }
+else:
+    CACHE_DIR = os.getenv('CACHE_DIR', str(BASE_DIR / '.cache'))
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+            'KEY_PREFIX': 'influencehub',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+        'auth': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(CACHE_DIR, 'auth'),
+            'KEY_PREFIX': 'influencehub',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+    }
+
 # Session settings
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# Cache-first sessions with a DB fallback; unchanged sessions are re-saved at most once per refresh interval.
+SESSION_ENGINE = 'authapp.sessions'
+SESSION_CACHE_ALIAS = 'auth'
+SESSION_REFRESH_INTERVAL = int(os.getenv('SESSION_REFRESH_INTERVAL', 60))
 SESSION_COOKIE_NAME = 'sessionid'
 SESSION_COOKIE_AGE = 1800
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 SESSION_SAVE_EVERY_REQUEST = True
 
 # Rate limiting settings
-RATELIMIT_USE_CACHE = 'default'
+RATELIMIT_USE_CACHE = 'auth'
 
 # Logging settings
 LOGGING = {
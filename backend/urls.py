@@ -1,5 +1,6 @@
 from django.urls import path, include
 from django.contrib import admin
+from .views import CacheMetricsView, RocketAPIMetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -9,4 +10,6 @@ urlpatterns = [
     path('insight/', include('brands_insightapp.urls')),
     path('suggestions/', include('brand_suggestionapp.urls')),
     path('chat/', include('chatapp.urls')),
+    path('cache/metrics/', CacheMetricsView.as_view(), name='cache-metrics'),
+    path('rocketapi/metrics/', RocketAPIMetricsView.as_view(), name='rocketapi-metrics'),
 ]
@@ -0,0 +1,21 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+
+from .cache import cache_metrics
+from .rocketapi import endpoint_metrics
+
+
+class CacheMetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_metrics(), status=status.HTTP_200_OK)
+
+
+class RocketAPIMetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(endpoint_metrics(), status=status.HTTP_200_OK)
@@ -0,0 +1,164 @@
+import os
+import time
+import asyncio
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, transaction
+
+from backend.rocketapi import AsyncRocketAPIClient, INSTAGRAM_HOST
+from brands_insightapp.models import Brand, BrandsSocialStats, BrandPost, upsert_brand_posts
+from brands_insightapp.utilities.brandScrapper import fetch_instagram_user_data, extract_relevant_data, summarize_media
+from brands_insightapp.utilities.brandPostScrapper import fetch_media_posts, process_posts
+from brands_insightapp.utilities.scraperEngine import SCRAPER_CONCURRENCY, scrape_batch
+from trend_analysisapp.db import db_sync_to_async
+
+STATS_UPDATE_FIELDS = [
+    'username', 'bio', 'is_verified', 'followers', 'followings', 'post_count',
+    'follower_ratio', 'engagement_score', 'engagement_per_follower', 'estimated_reach',
+    'estimated_impression', 'reach_ratio', 'avg_likes_computed', 'avg_comments_computed',
+    'avg_views', 'highest_post',
+]
+
+
+def to_decimal(value):
+    return Decimal(str(round(float(value or 0), 2)))
+
+
+async def scrape_brand(client, handle, api_key):
+    """
+    Profile stats and the latest 12 posts of one brand handle, from one
+    get_info and one get_media call.
+    """
+    relevant_data = extract_relevant_data(await fetch_instagram_user_data(client, handle, api_key))
+    if not relevant_data or relevant_data["user_id"] == "N/A":
+        return None
+    media = await fetch_media_posts(client, relevant_data["user_id"], api_key)
+    summary = summarize_media(media, relevant_data["followers"]) if media is not None else None
+    if summary is None:
+        # A failed get_media must not overwrite the stored stats and posts with zeros.
+        return None
+    return {
+        "profile": relevant_data,
+        "summary": summary,
+        "posts": process_posts(media)[:12],
+    }
+
+
+def build_stats(brand_id, result):
+    profile = result["profile"]
+    highest_post, avg_likes, avg_comments, avg_views, _, _, estimated_reach, estimated_impressions = result["summary"]
+    followers = profile["followers"]
+    # Ratios the CSV import used to carry, derived from the scraped counts.
+    engagement_score = avg_likes + avg_comments
+    return BrandsSocialStats(
+        brand_id=brand_id,
+        username=profile["username"],
+        bio=profile["bio"],
+        is_verified=profile["verified"],
+        followers=followers,
+        followings=profile["following"],
+        post_count=profile["posts"],
+        follower_ratio=to_decimal(followers / max(1, profile["following"])),
+        engagement_score=to_decimal(engagement_score),
+        engagement_per_follower=to_decimal(engagement_score / max(1, followers)),
+        estimated_reach=to_decimal(estimated_reach),
+        estimated_impression=to_decimal(estimated_impressions),
+        reach_ratio=to_decimal(estimated_reach / max(1, followers)),
+        avg_likes_computed=to_decimal(avg_likes),
+        avg_comments_computed=to_decimal(avg_comments),
+        avg_views=to_decimal(avg_views),
+        highest_post=highest_post or {},
+    )
+
+
+@transaction.atomic
+def write_batch(scraped):
+    """
+    Upsert one batch of (brand_id, result) pairs: one statement for the stats
+    rows, one id lookup, and one statement for all of their posts.
+    """
+    if not scraped:
+        return 0
+    BrandsSocialStats.objects.bulk_create(
+        [build_stats(brand_id, result) for brand_id, result in scraped],
+        update_conflicts=True,
+        unique_fields=['brand'],
+        update_fields=STATS_UPDATE_FIELDS,
+    )
+    stats_ids = dict(
+        BrandsSocialStats.objects.filter(brand_id__in=[brand_id for brand_id, _ in scraped])
+        .values_list('brand_id', 'id')
+    )
+    upsert_brand_posts([
+        BrandPost(
+            insta_stats_id=stats_ids[brand_id],
+            post_number=i,
+            post_detail=result["posts"][i - 1] if i - 1 < len(result["posts"]) else {},
+        )
+        for brand_id, result in scraped
+        for i in range(1, 13)
+    ])
+    return len(scraped)
+
+
+async def stream_brand_stats(brands, api_key, batch_size, concurrency):
+    """
+    Scrape brands batch by batch and upsert each finished batch while the
+    next one is being scraped. Returns the number of brands written.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    written = 0
+    pending_write = None
+    async with AsyncRocketAPIClient(INSTAGRAM_HOST, concurrency=concurrency) as client:
+        for start in range(0, len(brands), batch_size):
+            batch = brands[start:start + batch_size]
+            results = await scrape_batch(client, [handle for _, handle in batch], scrape_brand, api_key, semaphore)
+            scraped = [(brand_id, result) for (brand_id, _), result in zip(batch, results) if result]
+            if pending_write:
+                written += await pending_write
+            pending_write = asyncio.ensure_future(db_sync_to_async(write_batch)(scraped))
+        if pending_write:
+            written += await pending_write
+    return written
+
+
+class Command(BaseCommand):
+    help = "Scrape brand Instagram stats and posts straight into BrandsSocialStats and BrandPost."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help="Brands upserted per transaction.")
+        parser.add_argument('--concurrency', type=int, default=SCRAPER_CONCURRENCY, help="Handles scraped at once.")
+        parser.add_argument('--interval', type=int, default=0,
+                            help="Seconds between refreshes; 0 runs a single refresh.")
+
+    def handle(self, *args, **options):
+        api_key = os.getenv("ROCKETAPI_INSTA")
+        if not api_key:
+            raise CommandError("API key not set in environment variable 'ROCKETAPI_INSTA'")
+
+        try:
+            while True:
+                close_old_connections()
+                try:
+                    brands = [
+                        (brand_id, handle.strip().lstrip('@'))
+                        for brand_id, handle in Brand.objects.exclude(instagram_handle__isnull=True)
+                        .exclude(instagram_handle='').values_list('id', 'instagram_handle')
+                    ]
+                    written = asyncio.run(stream_brand_stats(
+                        brands, api_key, options['batch_size'], options['concurrency']
+                    ))
+                    self.stdout.write(self.style.SUCCESS(f"Updated social stats for {written} of {len(brands)} brands."))
+                except Exception as e:
+                    if not options['interval']:
+                        raise
+                    # One failed refresh (database or network) must not stop the periodic worker.
+                    print(f"Error refreshing brand stats: {str(e)}")
+                finally:
+                    close_old_connections()
+                if not options['interval']:
+                    return
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Brand stats refresh stopped."))
@@ -1,5 +1,5 @@
 import uuid
-from django.db import models
+from django.db import models, transaction
 
 # Sector Choices
 SECTOR_CHOICES = [
@@ -94,14 +94,35 @@ class BrandPost(models.Model):
     post_number = models.PositiveIntegerField()  # value from 1 to 12
     post_detail = models.JSONField()
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["insta_stats", "post_number"], name="brandpost_stats_number_uniq"),
+        ]
+
     def __str__(self):
         return f"Post {self.post_number} of {self.insta_stats.username}"
 
 
+def upsert_brand_posts(posts):
+    """
+    Insert or update BrandPost objects (for any number of stats rows) with a
+    single INSERT ... ON CONFLICT UPDATE on (insta_stats, post_number).
+    """
+    if posts:
+        BrandPost.objects.bulk_create(
+            posts,
+            update_conflicts=True,
+            unique_fields=["insta_stats", "post_number"],
+            update_fields=["post_detail"],
+        )
+
+
+@transaction.atomic
 def create_insta_posts(socialStats, posts_data):
     """
-    Creates 12 posts for the provided BrandsSocialStats instance using data from posts_data.
+    Creates or refreshes the 12 posts of the provided BrandsSocialStats instance using data from posts_data.
     """
-    for i in range(1, 13):
-        post_detail = posts_data[i - 1] if i - 1 < len(posts_data) else {}
-        BrandPost.objects.create(insta_stats=socialStats, post_number=i, post_detail=post_detail)
\ No newline at end of file
+    upsert_brand_posts([
+        BrandPost(insta_stats=socialStats, post_number=i, post_detail=posts_data[i - 1] if i - 1 < len(posts_data) else {})
+        for i in range(1, 13)
+    ])
\ No newline at end of file
@@ -1,60 +1,28 @@
-import http.client
 import json
-import time
 import os
+import argparse
 import pandas as pd
-import concurrent.futures
-import threading
 from dotenv import load_dotenv
 
-load_dotenv()
+import sys
+from pathlib import Path
 
-# A simple thread-safe rate limiter
-class RateLimiter:
-    def __init__(self, rate, per):
-        self.rate = rate      # e.g. 8 requests
-        self.per = per        # per this many seconds (e.g. 1 second)
-        self.allowance = rate
-        self.last_check = time.time()
-        self.lock = threading.Lock()
-
-    def wait(self):
-        with self.lock:
-            current = time.time()
-            time_passed = current - self.last_check
-            self.last_check = current
-            self.allowance += time_passed * (self.rate / self.per)
-            if self.allowance > self.rate:
-                self.allowance = self.rate
-            if self.allowance < 1.0:
-                sleep_time = (1.0 - self.allowance) * (self.per / self.rate)
-                time.sleep(sleep_time)
-                self.allowance = 0
-            else:
-                self.allowance -= 1.0
+# Run as a file (python brands_insightapp/utilities/brandPostScrapper.py) the repo root is not on
+# sys.path; add it so the backend and brands_insightapp imports resolve. `python -m` works too.
+if not __package__:
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-# Global rate limiter: 8 requests per second
-rate_limiter = RateLimiter(rate=8, per=1)
+from backend.rocketapi import INSTAGRAM_HOST, GET_INFO_PATH, GET_MEDIA_PATH
+from brands_insightapp.utilities.scraperEngine import (
+    SCRAPER_CONCURRENCY, scrape_column_checkpointed, clear_checkpoint, assign_results,
+)
 
-GET_INFO_URL = "/instagram/user/get_info"
-GET_MEDIA_URL = "/instagram/user/get_media"
-API_HOST = "rocketapi-for-instagram.p.rapidapi.com"
-HEADERS = {
-    "x-rapidapi-key": "",  # set dynamically
-    "x-rapidapi-host": API_HOST,
-    "Content-Type": "application/json"
-}
+load_dotenv()
 
-def fetch_user_id(username: str, api_key: str):
+async def fetch_user_id(client, username: str, api_key: str):
     """Fetches the user ID using the get_info endpoint with robust response validation."""
     try:
-        rate_limiter.wait()
-        conn = http.client.HTTPSConnection(API_HOST)
-        HEADERS["x-rapidapi-key"] = api_key
-        payload = json.dumps({"username": username})
-        conn.request("POST", GET_INFO_URL, body=payload, headers=HEADERS)
-        response = conn.getresponse()
-        data = json.loads(response.read().decode("utf-8"))
+        _, data = await client.post(GET_INFO_PATH, {"username": username}, api_key)
 
         # Validate the API response
         if not data:
@@ -79,20 +47,14 @@ def fetch_user_id(username: str, api_key: str):
         print(f"Exception fetching user id for {username}: {e}")
         return None
 
-def fetch_media_posts(user_id: int, api_key: str):
-    """Fetches media posts using the get_media endpoint."""
+async def fetch_media_posts(client, user_id: int, api_key: str):
+    """Fetches media posts using the get_media endpoint. Returns None when the request fails."""
     try:
-        rate_limiter.wait()
-        conn = http.client.HTTPSConnection(API_HOST)
-        HEADERS["x-rapidapi-key"] = api_key
         # Cast user_id to int to satisfy API requirements
-        payload = json.dumps({"id": int(user_id), "count": 50})
-        conn.request("POST", GET_MEDIA_URL, body=payload, headers=HEADERS)
-        response = conn.getresponse()
-        data = json.loads(response.read().decode("utf-8"))
-        if response.status != 200:
-            print(f"Error {response.status} for user_id {user_id}: {data}")
-            return []
+        status, data = await client.post(GET_MEDIA_PATH, {"id": int(user_id), "count": 50}, api_key)
+        if status != 200 or data is None:
+            print(f"Error {status} for user_id {user_id}: {data}")
+            return None
         media_items = data.get("response", {}).get("body", {}).get("items", [])
         # If items is a dict with numeric keys, sort and convert to list.
         if isinstance(media_items, dict):
@@ -105,7 +67,7 @@ def fetch_media_posts(user_id: int, api_key: str):
         return posts
     except Exception as e:
         print(f"Exception fetching media posts for user_id {user_id}: {e}")
-        return []
+        return None
 
 def process_posts(posts):
     """Extracts the required fields from up to 20 posts."""
@@ -129,22 +91,22 @@ def process_posts(posts):
         processed.append(post_obj)
     return processed
 
-def process_user(index, row, api_key):
+async def process_user(client, username, api_key):
     """
-    For a given user record, fetch the user id and media posts,
+    For a given handle, fetch the user id and media posts,
     then extract only the needed post-level data.
     Returns a dictionary with keys "post1" ... "post20".
     """
     try:
-        username = row["insta_id"]
-        if pd.isna(username) or username.strip() == "":
-            return index, None
         print(f"Processing {username}...")
-        user_id = fetch_user_id(username, api_key)
+        user_id = await fetch_user_id(client, username, api_key)
         if not user_id:
             print(f"User ID not found for {username}")
-            return index, None
-        posts = fetch_media_posts(user_id, api_key)
+            return None
+        posts = await fetch_media_posts(client, user_id, api_key)
+        if posts is None:
+            # Left unscraped (and uncheckpointed) so a resumed run retries it.
+            return None
         processed_posts = process_posts(posts)
         posts_dict = {}
         for i in range(20):
@@ -153,36 +115,38 @@ def process_user(index, row, api_key):
             else:
                 posts_dict[f"post{i+1}"] = ""
         print(f"Fetched {len(processed_posts)} posts for {username}")
-        return index, posts_dict
+        return posts_dict
     except Exception as e:
         print(f"Error processing {username}: {e}")
-        return index, None
+        return None
 
-def update_csv(input_file_path, output_file_path, api_key):
+def update_csv(input_file_path, output_file_path, api_key, concurrency=SCRAPER_CONCURRENCY, resume=False):
     try:
         df = pd.read_csv(input_file_path)
         # The column is already named 'insta_id'; just clean it.
         df["insta_id"] = df["insta_id"].str.replace(r"^@", "", regex=True).str.strip()
         # Add new columns for posts (post1 to post20)
-        for i in range(1, 21):
-            df[f"post{i}"] = ""
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-            future_to_index = {executor.submit(process_user, index, row, api_key): index for index, row in df.iterrows()}
-            for future in concurrent.futures.as_completed(future_to_index):
-                index, posts_dict = future.result()
-                if posts_dict:
-                    for key, value in posts_dict.items():
-                        df.at[index, key] = value
+        post_columns = [f"post{i}" for i in range(1, 21)]
+        for col in post_columns:
+            df[col] = ""
+        results = scrape_column_checkpointed(df, "insta_id", process_user, INSTAGRAM_HOST, api_key,
+                                             output_file_path, resume=resume, concurrency=concurrency)
+        assign_results(df, results, post_columns)
         df.to_csv(output_file_path, index=False)
+        clear_checkpoint(output_file_path)
         print(f"CSV updated and saved to {output_file_path}")
     except Exception as e:
         print(f"Error updating CSV: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape brand Instagram posts into a CSV.")
+    parser.add_argument("--resume", action="store_true", help="Skip handles finished by an interrupted run.")
+    args = parser.parse_args()
+
     API_KEY = os.getenv("ROCKETAPI_INSTA")
     if not API_KEY:
         print("API key not set in environment variable 'ROCKETAPI_INSTA'")
     else:
         input_file_path = r"C:\project\influenceHub\BrandData.csv"
         output_file_path = r"C:\project\influenceHub\BrandData_with_Posts.csv"
-        update_csv(input_file_path, output_file_path, API_KEY)
+        update_csv(input_file_path, output_file_path, API_KEY, resume=args.resume)
@@ -1,64 +1,34 @@
-import http.client
 import json
-import time
 import os
+import argparse
 import pandas as pd
-import concurrent.futures
-import threading
 
-# A simple thread-safe rate limiter
-class RateLimiter:
-    def __init__(self, rate, per):
-        self.rate = rate      # e.g. 8 requests
-        self.per = per        # per this many seconds (e.g. 1 second)
-        self.allowance = rate
-        self.last_check = time.time()
-        self.lock = threading.Lock()
+import sys
+from pathlib import Path
 
-    def wait(self):
-        with self.lock:
-            current = time.time()
-            time_passed = current - self.last_check
-            self.last_check = current
-            self.allowance += time_passed * (self.rate / self.per)
-            if self.allowance > self.rate:
-                self.allowance = self.rate
-            if self.allowance < 1.0:
-                sleep_time = (1.0 - self.allowance) * (self.per / self.rate)
-                time.sleep(sleep_time)
-                self.allowance = 0
-            else:
-                self.allowance -= 1.0
+# Run as a file (python brands_insightapp/utilities/brandScrapper.py) the repo root is not on
+# sys.path; add it so the backend and brands_insightapp imports resolve. `python -m` works too.
+if not __package__:
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-# Global rate limiter: 8 requests per second
-rate_limiter = RateLimiter(rate=8, per=1)
+from backend.rocketapi import INSTAGRAM_HOST, GET_INFO_PATH, GET_MEDIA_PATH
+from brands_insightapp.utilities.scraperEngine import (
+    SCRAPER_CONCURRENCY, scrape_column_checkpointed, clear_checkpoint, assign_results,
+)
 
 def get_media_type(media_type):
     media_mapping = {1: "Photo", 2: "Video", 3: "Carousel"}
     return media_mapping.get(media_type, "Unknown")
 
-def fetch_instagram_user_data(username: str, api_key: str):
+async def fetch_instagram_user_data(client, username: str, api_key: str):
     try:
-        rate_limiter.wait()
-        conn = http.client.HTTPSConnection("rocketapi-for-instagram.p.rapidapi.com")
-        headers = {
-            "x-rapidapi-key": api_key,
-            "x-rapidapi-host": "rocketapi-for-instagram.p.rapidapi.com",
-            "Content-Type": "application/json"
-        }
-        payload = json.dumps({"username": username})
-        conn.request("POST", "/instagram/user/get_info", body=payload, headers=headers)
-        response = conn.getresponse()
-        response_data = response.read().decode("utf-8")
-    
-        try:
-            json_data = json.loads(response_data)
-        except json.JSONDecodeError:
-            print(f"Error: Invalid JSON response for {username}: {response_data}")
+        status, json_data = await client.post(GET_INFO_PATH, {"username": username}, api_key)
+        if json_data is None:
+            print(f"Error: Invalid JSON response for {username} (status {status})")
             return None
     
-        if response.status != 200:
-            print(f"Error {response.status} for {username}: {json_data}")
+        if status != 200:
+            print(f"Error {status} for {username}: {json_data}")
             return None
     
         return json_data
@@ -98,35 +68,33 @@ def extract_relevant_data(user_data):
         print(f"Exception in extract_relevant_data: {str(e)}")
         return None
 
-def fetch_instagram_user_media(user_id: int, api_key: str, followers: int):
+async def fetch_instagram_user_media(client, user_id: int, api_key: str, followers: int):
     try:
         if not user_id:
             return None, 0, 0, 0, None, 0, 0, 0
 
-        rate_limiter.wait()
-        conn = http.client.HTTPSConnection("rocketapi-for-instagram.p.rapidapi.com")
-        headers = {
-            "x-rapidapi-key": api_key,
-            "x-rapidapi-host": "rocketapi-for-instagram.p.rapidapi.com",
-            "Content-Type": "application/json"
-        }
-        payload = json.dumps({"id": user_id, "count": 50})
-        conn.request("POST", "/instagram/user/get_media", body=payload, headers=headers)
-        response = conn.getresponse()
-        response_data = response.read().decode("utf-8")
-    
-        try:
-            json_data = json.loads(response_data)
-        except json.JSONDecodeError:
-            print(f"Error: Invalid JSON response for user_id {user_id}: {response_data}")
+        status, json_data = await client.post(GET_MEDIA_PATH, {"id": user_id, "count": 50}, api_key)
+        if json_data is None:
+            print(f"Error: Invalid JSON response for user_id {user_id} (status {status})")
             return None
     
-        if response.status != 200:
-            print(f"Error {response.status} for user_id {user_id}: {json_data}")
+        if status != 200:
+            print(f"Error {status} for user_id {user_id}: {json_data}")
             return None
 
         media_data = json_data.get("response", {}).get("body", {}).get("items", [])
-    
+        return summarize_media(media_data, followers)
+    except Exception as e:
+        print(f"Exception in fetch_instagram_user_media for user_id {user_id}: {str(e)}")
+        return None
+
+def summarize_media(media_data, followers):
+    """
+    Engagement summary of a profile's recent media items. Returns
+    (highest_post, avg_likes, avg_comments, avg_views, success_ratio,
+    engagement_rate, estimated_reach, estimated_impressions).
+    """
+    try:
         highest_post = None
         highest_likes = 0
         highest_comments = 0
@@ -198,23 +166,20 @@ def fetch_instagram_user_media(user_id: int, api_key: str, followers: int):
 
         return highest_post, avg_likes, avg_comments, avg_views, success_ratio, engagement_rate, estimated_reach, estimated_impressions
     except Exception as e:
-        print(f"Exception in fetch_instagram_user_media for user_id {user_id}: {str(e)}")
+        print(f"Exception in summarize_media: {str(e)}")
         return None
 
-def process_user(index, row, API_KEY):
+async def process_user(client, username, API_KEY):
     try:
-        username = row["insta_id"]
-        if pd.isna(username) or username == "":
-            return index, None
         print(f"Fetching data for: {username}")
     
-        user_data = fetch_instagram_user_data(username, API_KEY)
+        user_data = await fetch_instagram_user_data(client, username, API_KEY)
         if not user_data:
-            return index, None
+            return None
     
         relevant_data = extract_relevant_data(user_data)
         if not relevant_data:
-            return index, None
+            return None
     
         results = {
             "username": relevant_data["username"],
@@ -240,7 +205,10 @@ def process_user(index, row, API_KEY):
         }
     
         if relevant_data["user_id"] != "N/A":
-            media_results = fetch_instagram_user_media(int(relevant_data["user_id"]), API_KEY, relevant_data["followers"])
+            media_results = await fetch_instagram_user_media(client, int(relevant_data["user_id"]), API_KEY, relevant_data["followers"])
+            if media_results is None:
+                # Leave the handle unscraped (and retried on resume) rather than storing zeros.
+                return None
             if media_results:
                 (highest_post, avg_likes, avg_comments, avg_views, success_ratio,
                  engagement_rate, estimated_reach, estimated_impressions) = media_results
@@ -258,12 +226,12 @@ def process_user(index, row, API_KEY):
                 results["engagement_rate"] = engagement_rate
                 results["estimated_reach"] = estimated_reach
                 results["estimated_impression"] = estimated_impressions
-        return index, results
+        return results
     except Exception as e:
-        print(f"Error processing user at index {index}: {str(e)}")
-        return index, None
+        print(f"Error processing user {username}: {str(e)}")
+        return None
 
-def update_excel(file_path, API_KEY):
+def update_excel(file_path, API_KEY, concurrency=SCRAPER_CONCURRENCY, resume=False):
     try:
         # Load the existing CSV file
         df = pd.read_csv(file_path)
@@ -296,25 +264,22 @@ def update_excel(file_path, API_KEY):
         for col, default in columns_to_add.items():
             df[col] = default
     
-        # Use ThreadPoolExecutor to process users concurrently.
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-            future_to_index = {executor.submit(process_user, index, row, API_KEY): index for index, row in df.iterrows()}
-            for future in concurrent.futures.as_completed(future_to_index):
-                try:
-                    index, result = future.result()
-                    if result:
-                        for key, value in result.items():
-                            df.at[index, key] = value
-                except Exception as e:
-                    idx = future_to_index.get(future, "Unknown")
-                    print(f"Error in future for index {idx}: {str(e)}")
+        # Scrape every handle concurrently with checkpoints, then write all result columns in one step.
+        results = scrape_column_checkpointed(df, "insta_id", process_user, INSTAGRAM_HOST, API_KEY,
+                                             file_path, resume=resume, concurrency=concurrency)
+        assign_results(df, results, list(columns_to_add))
     
         df.to_csv(file_path, index=False)
+        clear_checkpoint(file_path)
         print(f"Updated data saved to {file_path}")
     except Exception as e:
         print(f"Exception in update_excel: {str(e)}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape brand Instagram stats into the brand CSV.")
+    parser.add_argument("--resume", action="store_true", help="Skip handles finished by an interrupted run.")
+    args = parser.parse_args()
+
     API_KEY = os.getenv("ROCKETAPI_INSTA")
     file_path = r"C:\project\influenceHub\BrandData.csv"   
-    update_excel(file_path, API_KEY)
+    update_excel(file_path, API_KEY, resume=args.resume)
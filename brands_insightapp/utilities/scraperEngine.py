@@ -0,0 +1,152 @@
+import os
+import json
+import asyncio
+import pandas as pd
+
+from backend.rocketapi import AsyncRocketAPIClient
+
+# Handles scraped at once. Throughput is bounded by the shared RocketAPI rate
+# limiter, so this only needs to be high enough to keep the quota busy.
+SCRAPER_CONCURRENCY = int(os.getenv('SCRAPER_CONCURRENCY', 16))
+# Handles scraped between two checkpoint flushes.
+SCRAPER_CHUNK_SIZE = int(os.getenv('SCRAPER_CHUNK_SIZE', 100))
+
+
+def is_blank_handle(handle):
+    return not isinstance(handle, str) or handle.strip() == ""
+
+
+async def scrape_batch(client, handles, process, api_key, semaphore):
+    """
+    Run `await process(client, handle, api_key)` for every handle, bounded by
+    `semaphore`. Returns the results in handle order; blank handles and
+    failures give None.
+    """
+    async def run(handle):
+        if is_blank_handle(handle):
+            return None
+        async with semaphore:
+            try:
+                return await process(client, handle, api_key)
+            except Exception as e:
+                print(f"Error processing {handle}: {str(e)}")
+                return None
+
+    return await asyncio.gather(*(run(handle) for handle in handles))
+
+
+def checkpoint_paths(output_file):
+    """
+    Files kept next to the output while a run is in progress: an append-only
+    JSON-lines file of scraped rows and the list of completed handles.
+    """
+    return f"{output_file}.rows.jsonl", f"{output_file}.checkpoint"
+
+
+def load_checkpoint(output_file):
+    """
+    Completed handles and their scraped rows from an earlier, interrupted run.
+    A torn last line from a crash mid-write is ignored.
+    """
+    rows_path, checkpoint_path = checkpoint_paths(output_file)
+    done, rows = set(), {}
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path, encoding="utf-8") as f:
+            done = {line.strip() for line in f if line.strip()}
+    if os.path.exists(rows_path):
+        with open(rows_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                if row["handle"] in done:
+                    rows[row["handle"]] = row["result"]
+    # A handle only counts as done once its row is readable too.
+    return set(rows), rows
+
+
+def append_chunk(output_file, handles, results):
+    """
+    Persist one finished chunk: rows first, then the handles marked as done,
+    each flushed to disk so a crash never checkpoints a handle without its row.
+    Handles that failed are not checkpointed and are retried on resume.
+    """
+    rows_path, checkpoint_path = checkpoint_paths(output_file)
+    finished = [(handle, result) for handle, result in zip(handles, results) if result is not None]
+    with open(rows_path, "ab+") as f:
+        # Terminate a line torn by an earlier crash so it cannot swallow the next row.
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+        for handle, result in finished:
+            f.write((json.dumps({"handle": handle, "result": result}, default=str) + "\n").encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+    with open(checkpoint_path, "a", encoding="utf-8") as f:
+        for handle, _ in finished:
+            f.write(handle + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def clear_checkpoint(output_file):
+    for path in checkpoint_paths(output_file):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+async def scrape_handles_checkpointed(handles, process, host, api_key, output_file, resume=False,
+                                      concurrency=SCRAPER_CONCURRENCY, chunk_size=SCRAPER_CHUNK_SIZE):
+    """
+    Scrape the distinct handles in chunks, flushing every finished chunk to the
+    checkpoint files. With `resume`, handles completed by an earlier run are
+    skipped and their stored rows reused. Returns {handle: result}.
+    """
+    if resume:
+        done, rows = load_checkpoint(output_file)
+        print(f"Resuming: {len(done)} handles already scraped.")
+    else:
+        clear_checkpoint(output_file)
+        done, rows = set(), {}
+
+    pending = list(dict.fromkeys(h for h in handles if not is_blank_handle(h) and h not in done))
+    semaphore = asyncio.Semaphore(concurrency)
+    async with AsyncRocketAPIClient(host, concurrency=concurrency) as client:
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            results = await scrape_batch(client, chunk, process, api_key, semaphore)
+            append_chunk(output_file, chunk, results)
+            rows.update((handle, result) for handle, result in zip(chunk, results) if result is not None)
+            print(f"Checkpointed {min(start + chunk_size, len(pending))}/{len(pending)} handles.")
+    return rows
+
+
+def scrape_column_checkpointed(df, column, process, host, api_key, output_file, resume=False,
+                               concurrency=SCRAPER_CONCURRENCY, chunk_size=SCRAPER_CHUNK_SIZE):
+    """
+    Scrape every handle in df[column], checkpointing as it goes; returns one
+    result (dict or None) per row.
+    Call clear_checkpoint(output_file) once the merged output has been written.
+    """
+    rows = asyncio.run(scrape_handles_checkpointed(
+        df[column].tolist(), process, host, api_key, output_file, resume, concurrency, chunk_size
+    ))
+    return [None if is_blank_handle(handle) else rows.get(handle) for handle in df[column].tolist()]
+
+
+def assign_results(df, results, columns):
+    """
+    Write per-row result dicts into `columns` with one vectorized assignment.
+    Rows whose result is None keep their current values.
+    """
+    mask = [result is not None for result in results]
+    if not any(mask):
+        return df
+    scraped = pd.DataFrame([result for result in results if result is not None], index=df.index[mask], columns=columns)
+    for column in columns:
+        # Result columns may hold lists or floats; widen them so values are stored as-is.
+        df[column] = df[column].astype(object)
+    df.loc[mask, columns] = scraped
+    return df
@@ -1,63 +1,33 @@
-import http.client
 import json
-import time
 import os
+import argparse
 import pandas as pd
-import concurrent.futures
-import threading
 from dotenv import load_dotenv
 
-load_dotenv()
+import sys
+from pathlib import Path
 
-# A simple thread-safe rate limiter
-class RateLimiter:
-    def __init__(self, rate, per):
-        self.rate = rate      # e.g. 8 requests
-        self.per = per        # per this many seconds (e.g. 1 second)
-        self.allowance = rate
-        self.last_check = time.time()
-        self.lock = threading.Lock()
+# Run as a file (python brands_insightapp/utilities/userScrapper.py) the repo root is not on
+# sys.path; add it so the backend and brands_insightapp imports resolve. `python -m` works too.
+if not __package__:
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-    def wait(self):
-        with self.lock:
-            current = time.time()
-            time_passed = current - self.last_check
-            self.last_check = current
-            self.allowance += time_passed * (self.rate / self.per)
-            if self.allowance > self.rate:
-                self.allowance = self.rate
-            if self.allowance < 1.0:
-                sleep_time = (1.0 - self.allowance) * (self.per / self.rate)
-                time.sleep(sleep_time)
-                self.allowance = 0
-            else:
-                self.allowance -= 1.0
+from backend.rocketapi import INSTAGRAM_HOST, GET_INFO_PATH, GET_MEDIA_PATH
+from brands_insightapp.utilities.scraperEngine import (
+    SCRAPER_CONCURRENCY, scrape_column_checkpointed, clear_checkpoint, assign_results,
+)
 
-# Global rate limiter: 8 requests per second
-rate_limiter = RateLimiter(rate=8, per=1)
+load_dotenv()
 
-def fetch_instagram_user_data(username: str, api_key: str):
+async def fetch_instagram_user_data(client, username: str, api_key: str):
     try:
-        rate_limiter.wait()
-        conn = http.client.HTTPSConnection("rocketapi-for-instagram.p.rapidapi.com")
-        headers = {
-            "x-rapidapi-key": api_key,
-            "x-rapidapi-host": "rocketapi-for-instagram.p.rapidapi.com",
-            "Content-Type": "application/json"
-        }
-        payload = json.dumps({"username": username})
-        conn.request("POST", "/instagram/user/get_info", body=payload, headers=headers)
-        response = conn.getresponse()
-        response_data = response.read().decode("utf-8")
-    
-        try:
-            json_data = json.loads(response_data)
-        except json.JSONDecodeError:
-            print(f"Error: Invalid JSON response for {username}: {response_data}")
+        status, json_data = await client.post(GET_INFO_PATH, {"username": username}, api_key)
+        if json_data is None:
+            print(f"Error: Invalid JSON response for {username} (status {status})")
             return None
     
-        if response.status != 200:
-            print(f"Error {response.status} for {username}: {json_data}")
+        if status != 200:
+            print(f"Error {status} for {username}: {json_data}")
             return None
     
         return json_data
@@ -100,30 +70,17 @@ def extract_relevant_data(user_data):
         print(f"Exception in extract_relevant_data: {str(e)}")
         return None
 
-def fetch_instagram_user_media(user_id: int, api_key: str, followers: int):
+async def fetch_instagram_user_media(client, user_id: int, api_key: str, followers: int):
     try:
         if not user_id:
             return []
-        rate_limiter.wait()
-        conn = http.client.HTTPSConnection("rocketapi-for-instagram.p.rapidapi.com")
-        headers = {
-            "x-rapidapi-key": api_key,
-            "x-rapidapi-host": "rocketapi-for-instagram.p.rapidapi.com",
-            "Content-Type": "application/json"
-        }
-        payload = json.dumps({"id": user_id, "count": 50})
-        conn.request("POST", "/instagram/user/get_media", body=payload, headers=headers)
-        response = conn.getresponse()
-        response_data = response.read().decode("utf-8")
-    
-        try:
-            json_data = json.loads(response_data)
-        except json.JSONDecodeError:
-            print(f"Error: Invalid JSON response for user_id {user_id}: {response_data}")
+        status, json_data = await client.post(GET_MEDIA_PATH, {"id": user_id, "count": 50}, api_key)
+        if json_data is None:
+            print(f"Error: Invalid JSON response for user_id {user_id} (status {status})")
             return []
     
-        if response.status != 200:
-            print(f"Error {response.status} for user_id {user_id}: {json_data}")
+        if status != 200:
+            print(f"Error {status} for user_id {user_id}: {json_data}")
             return []
     
         media_data = json_data.get("response", {}).get("body", {}).get("items", [])
@@ -155,20 +112,17 @@ def fetch_instagram_user_media(user_id: int, api_key: str, followers: int):
         print(f"Exception in fetch_instagram_user_media for user_id {user_id}: {str(e)}")
         return []
 
-def process_user(index, row, API_KEY):
+async def process_user(client, username, API_KEY):
     try:
-        username = row["insta_id"]
-        if pd.isna(username) or username == "":
-            return index, None
         print(f"Fetching data for: {username}")
     
-        user_data = fetch_instagram_user_data(username, API_KEY)
+        user_data = await fetch_instagram_user_data(client, username, API_KEY)
         if not user_data:
-            return index, None
+            return None
     
         relevant_data = extract_relevant_data(user_data)
         if not relevant_data:
-            return index, None
+            return None
     
         results = {
             "username": relevant_data["username"],
@@ -180,19 +134,22 @@ def process_user(index, row, API_KEY):
             "posts_count": relevant_data["posts"],
             "is_verified": relevant_data["verified"],
             "is_professionalAccount": relevant_data["professionalAccount"],
-            "media_details": []  # This will hold the list of media items
         }
     
+        media_details = []
         if relevant_data["user_id"] != "N/A":
-            media_results = fetch_instagram_user_media(int(relevant_data["user_id"]), API_KEY, relevant_data["followers"])
+            media_results = await fetch_instagram_user_media(client, int(relevant_data["user_id"]), API_KEY, relevant_data["followers"])
             if media_results:
-                results["media_details"] = media_results
-        return index, results
+                media_details = media_results
+        # Posts become the post1..post12 columns as JSON strings.
+        for i in range(12):
+            results[f"post{i+1}"] = json.dumps(media_details[i]) if i < len(media_details) else ""
+        return results
     except Exception as e:
-        print(f"Error processing user at index {index}: {str(e)}")
-        return index, None
+        print(f"Error processing user {username}: {str(e)}")
+        return None
 
-def update_csv(input_file: str, output_file: str, API_KEY: str):
+def update_csv(input_file: str, output_file: str, API_KEY: str, concurrency=SCRAPER_CONCURRENCY, resume=False):
     try:
         # Load the existing CSV file
         df = pd.read_csv(input_file)
@@ -218,44 +175,32 @@ def update_csv(input_file: str, output_file: str, API_KEY: str):
                 df[col] = default
     
         # Add columns for post details (post1 to post12)
-        for i in range(1, 13):
-            col_name = f"post{i}"
+        post_columns = [f"post{i}" for i in range(1, 13)]
+        for col_name in post_columns:
             if col_name not in df.columns:
                 df[col_name] = ""
     
-        # Process users concurrently using ThreadPoolExecutor
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-            future_to_index = {executor.submit(process_user, index, row, API_KEY): index 
-                               for index, row in df.iterrows()}
-            for future in concurrent.futures.as_completed(future_to_index):
-                try:
-                    index, result = future.result()
-                    if result:
-                        for key, value in result.items():
-                            if key != "media_details":
-                                df.at[index, key] = value
-                        posts = result.get("media_details", [])
-                        for i in range(12):
-                            col_name = f"post{i+1}"
-                            if i < len(posts):
-                                df.at[index, col_name] = json.dumps(posts[i])
-                            else:
-                                df.at[index, col_name] = ""
-                except Exception as e:
-                    idx = future_to_index.get(future, "Unknown")
-                    print(f"Error in future for index {idx}: {str(e)}")
+        # Scrape every handle concurrently, then write all result columns in one step.
+        results = scrape_column_checkpointed(df, "insta_id", process_user, INSTAGRAM_HOST, API_KEY,
+                                             output_file, resume=resume, concurrency=concurrency)
+        assign_results(df, results, list(basic_columns) + post_columns)
     
         # Write the updated dataframe to a new CSV file
         df.to_csv(output_file, index=False)
+        clear_checkpoint(output_file)
         print(f"Updated data saved to {output_file}")
     except Exception as e:
         print(f"Exception in update_csv: {str(e)}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape influencer Instagram stats and posts into a CSV.")
+    parser.add_argument("--resume", action="store_true", help="Skip handles finished by an interrupted run.")
+    args = parser.parse_args()
+
     API_KEY = os.getenv("ROCKETAPI_INSTA", "your_api_key_here")
     
     # Set input and output CSV file paths
     input_file = r"C:\project\influenceHub\influencerDataRef.csv"
     output_file = r"C:\project\influenceHub\influencerDataRef.csv"
     
-    update_csv(input_file, output_file, API_KEY)
+    update_csv(input_file, output_file, API_KEY, resume=args.resume)
@@ -2,11 +2,12 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.core.mail import send_mail
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
 from .models import Campaign, HistoricalCampaign
 from .serializers import CampaignSerializer
+from authapp.outbox import enqueue_email
 
 class CreateCampaign(APIView):
     permission_classes = [IsAuthenticated]
@@ -58,24 +59,25 @@ class UpdateCampaignStatus(APIView):
             return Response({"error": "Invalid status. Valid statuses are: {}.".format(', '.join(valid_statuses))}, status=status.HTTP_400_BAD_REQUEST)
         
         old_status = campaign.status
-        campaign.status = new_status
-        campaign.save()
-        
-        if old_status != new_status:
-            self.send_status_update_email(request.user.email, campaign.title, new_status)
-        
-        # Archive campaign if its status is completed and updated_at is more than 3 days old
-        if campaign.status == "completed":
-            if timezone.now() - campaign.updated_at > timedelta(days=3):
-                self.archive_campaign(campaign)
-                return Response({"message": "Campaign archived and transferred to history. You have been notified via email."}, status=status.HTTP_200_OK)
+        with transaction.atomic():
+            campaign.status = new_status
+            campaign.save()
+            
+            if old_status != new_status:
+                self.send_status_update_email(request.user.email, campaign.title, new_status)
+            
+            # Archive campaign if its status is completed and updated_at is more than 3 days old
+            if campaign.status == "completed":
+                if timezone.now() - campaign.updated_at > timedelta(days=3):
+                    self.archive_campaign(campaign)
+                    return Response({"message": "Campaign archived and transferred to history. You have been notified via email."}, status=status.HTTP_200_OK)
         
         return Response({"message": "Campaign status updated to {}.".format(new_status)}, status=status.HTTP_200_OK)
         
     def send_status_update_email(self, email, campaign_title, status):
         subject = "Campaign Status Update: {}".format(campaign_title)
         message = "The status of your campaign '{}' has been updated to '{}'.".format(campaign_title, status)
-        send_mail(subject, message, 'noreply@campaignapp.com', [email])
+        enqueue_email(subject, message, 'noreply@campaignapp.com', [email])
         
     def archive_campaign(self, campaign):
         # Create a historical campaign entry
@@ -95,6 +97,6 @@ class UpdateCampaignStatus(APIView):
         subject = "Campaign Archived: {}".format(campaign.title)
         message = ("Your campaign '{}' has been archived and transferred to our historical records because it was completed "
                    "and not updated for more than 3 days.").format(campaign.title)
-        send_mail(subject, message, 'noreply@campaignapp.com', [campaign.user.email])
+        enqueue_email(subject, message, 'noreply@campaignapp.com', [campaign.user.email])
         # Delete the active campaign
         campaign.delete()
@@ -0,0 +1,50 @@
+from django.db import transaction
+from django.db.models import Avg, Count, Sum
+from django.utils import timezone
+
+from .models import Trend, TrendAggregate
+
+
+@transaction.atomic
+def refresh_trend_aggregates():
+    """
+    Rebuild TrendAggregate from a single GROUP BY (category, subreddit) pass.
+    Category totals are folded from the subreddit rows instead of a second query.
+    """
+    updated_at = timezone.now()
+    rows = Trend.objects.values('category', 'subreddit').annotate(
+        trend_count=Count('id'),
+        total_volume=Sum('volume'),
+        total_comments=Sum('num_comments'),
+        avg_sentiment=Avg('sentiment'),
+        avg_growth=Avg('growth'),
+    ).order_by()
+
+    aggregates = []
+    categories = {}
+    for row in rows:
+        aggregates.append(TrendAggregate(updated_at=updated_at, **row))
+        totals = categories.setdefault(row['category'], {
+            'trend_count': 0, 'total_volume': 0, 'total_comments': 0, 'sentiment_sum': 0.0, 'growth_sum': 0.0,
+        })
+        totals['trend_count'] += row['trend_count']
+        totals['total_volume'] += row['total_volume'] or 0
+        totals['total_comments'] += row['total_comments'] or 0
+        totals['sentiment_sum'] += (row['avg_sentiment'] or 0) * row['trend_count']
+        totals['growth_sum'] += (row['avg_growth'] or 0) * row['trend_count']
+
+    for category, totals in categories.items():
+        aggregates.append(TrendAggregate(
+            category=category,
+            subreddit='',
+            trend_count=totals['trend_count'],
+            total_volume=totals['total_volume'],
+            total_comments=totals['total_comments'],
+            avg_sentiment=totals['sentiment_sum'] / totals['trend_count'],
+            avg_growth=totals['growth_sum'] / totals['trend_count'],
+            updated_at=updated_at,
+        ))
+
+    TrendAggregate.objects.all().delete()
+    TrendAggregate.objects.bulk_create(aggregates)
+    return len(aggregates)
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def create_trend_search_index(sender, using, **kwargs):
+    from .search import ensure_search_index
+    ensure_search_index(using)
 
 
 class CampignappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'trend_analysisapp'
+
+    def ready(self):
+        post_migrate.connect(create_trend_search_index, sender=self)
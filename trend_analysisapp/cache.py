@@ -0,0 +1,73 @@
+import time
+import hashlib
+
+from backend.cache import CacheNamespace
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+trend_cache = CacheNamespace('trend')
+TREND_VERSION_KEY = 'version'
+TREND_LISTING_TIMEOUT = 60 * 60
+LISTING_PARAMS = ('search', 'category', 'region', 'order', 'cursor', 'count')
+
+
+def get_trend_version():
+    """
+    Return the (version, last_modified) pair of the trend data.
+    The version is a nanosecond timestamp, so a fresh one is still unique if the
+    key is ever evicted from the cache.
+    """
+    state = trend_cache.get(TREND_VERSION_KEY)
+    if state is None:
+        trend_cache.add(TREND_VERSION_KEY, (time.time_ns(), time.time()), None)
+        state = trend_cache.get(TREND_VERSION_KEY) or (time.time_ns(), time.time())
+    return state
+
+
+def bump_trend_version():
+    """
+    Mark the trend data as changed. Every cached listing is keyed by the
+    version, so this invalidates all of them in O(1) without touching any key.
+    """
+    state = (time.time_ns(), time.time())
+    trend_cache.set(TREND_VERSION_KEY, state, None)
+    return state
+
+
+def listing_params_key(request):
+    """
+    Hash of the normalized listing query parameters (unknown and empty ones ignored).
+    """
+    params = []
+    for name in LISTING_PARAMS:
+        value = request.query_params.get(name, '').strip()
+        if value:
+            params.append((name, value.lower() if name in ('category', 'order', 'count') else value))
+    raw = '{}|{}'.format(request.get_host(), params)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def listing_cache_key(params_key):
+    return f'listing:{params_key}'
+
+
+def listing_etag(version, params_key):
+    return quote_etag(f'{version}-{params_key[:16]}')
+
+
+def is_not_modified(request, etag, last_modified):
+    """
+    Evaluate If-None-Match / If-Modified-Since against the current trend version.
+    """
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and int(last_modified) <= if_modified_since
+
+
+def set_validator_headers(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Shared caches may store the page but must revalidate it on every use.
+    response['Cache-Control'] = 'public, no-cache'
+    return response
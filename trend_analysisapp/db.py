@@ -0,0 +1,24 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def db_sync_to_async(func):
+    """
+    sync_to_async for ORM work on an arbitrary executor thread.
+
+    thread_sensitive=False is needed because the refresh pipeline can run
+    inside a sync view's asyncio.run(), where the thread-sensitive executor
+    is already in use. Those threads live outside Django's request cycle, so
+    their connections are released here the way a finished request would.
+    """
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)
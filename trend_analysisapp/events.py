@@ -0,0 +1,115 @@
+import json
+import time
+import asyncio
+
+from backend.cache import CacheNamespace
+
+# Trend change events are kept in the shared cache as a short, numbered log:
+# the refresher appends to it and every web worker tails it once for all of its
+# connected SSE clients.
+event_cache = CacheNamespace('events')
+EVENT_SEQ_KEY = 'seq'
+EVENT_KEY = 'event:{}'
+EVENT_TIMEOUT = 60 * 60
+POLL_INTERVAL = 2
+# Most events a worker or a reconnecting client catches up on at once.
+EVENT_BACKLOG = 100
+SUBSCRIBER_QUEUE_SIZE = 16
+
+
+def group_changes(new=(), updated=(), removed=()):
+    """
+    Build a compact {category: {'new': [...], 'updated': [...], 'removed': [...]}}
+    diff from (trend id, category) pairs.
+    """
+    changes = {}
+    for kind, pairs in (('new', new), ('updated', updated), ('removed', removed)):
+        for trend_id, category in pairs:
+            changes.setdefault(category, {'new': [], 'updated': [], 'removed': []})[kind].append(trend_id)
+    return changes
+
+
+def publish_trend_changes(changes):
+    """
+    Append a diff to the event log. Returns the event sequence number.
+    """
+    if not changes:
+        return None
+    # A counter lost to a cache restart or eviction starts again from the clock, not 0,
+    # so event ids keep increasing and workers and Last-Event-IDs never wait for it to catch up.
+    event_cache.add(EVENT_SEQ_KEY, int(time.time() * 1000), None)
+    seq = event_cache.incr(EVENT_SEQ_KEY)
+    event_cache.set(EVENT_KEY.format(seq), {'id': seq, 'changes': changes}, EVENT_TIMEOUT)
+    return seq
+
+
+def event_for_category(event, category):
+    """
+    Narrow an event to one category; None when it has nothing for that category.
+    """
+    if not category:
+        return event
+    if category not in event['changes']:
+        return None
+    return {'id': event['id'], 'changes': {category: event['changes'][category]}}
+
+
+def format_sse(event):
+    return 'id: {}\nevent: trends\ndata: {}\n\n'.format(event['id'], json.dumps(event['changes']))
+
+
+class TrendEventBroadcaster:
+    """
+    One per worker process. A single background task polls the event log and
+    fans new events out to per-connection queues, so idle SSE connections cost
+    a queue each and no cache traffic of their own.
+    """
+    def __init__(self):
+        self.subscribers = set()
+        self.last_seq = None
+        self.task = None
+
+    async def read_events(self, after_seq, until_seq):
+        """
+        Events after after_seq up to until_seq, at most EVENT_BACKLOG of them.
+        A counter that went backwards was reset, so everything up to until_seq is new.
+        """
+        if after_seq > until_seq:
+            after_seq = 0
+        after_seq = max(after_seq, until_seq - EVENT_BACKLOG)
+        keys = [EVENT_KEY.format(seq) for seq in range(after_seq + 1, until_seq + 1)]
+        found = await event_cache.aget_many(keys)
+        return [found[key] for key in keys if key in found]
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    async def current_seq(self):
+        return await event_cache.aget(EVENT_SEQ_KEY) or 0
+
+    async def run(self):
+        self.last_seq = await self.current_seq()
+        while self.subscribers:
+            await asyncio.sleep(POLL_INTERVAL)
+            seq = await self.current_seq()
+            if seq == self.last_seq:
+                continue
+            events = await self.read_events(self.last_seq, seq)
+            self.last_seq = seq
+            for queue in list(self.subscribers):
+                for event in events:
+                    try:
+                        queue.put_nowait(event)
+                    except asyncio.QueueFull:
+                        # A client this far behind will catch up from the listing on reconnect.
+                        break
+
+
+broadcaster = TrendEventBroadcaster()
@@ -0,0 +1,133 @@
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Avg, Max
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from .models import TrendSnapshot
+
+# Raw snapshots are kept for a day, hourly rollups for a week and daily rollups for 90 days.
+RAW_RETENTION = timedelta(days=1)
+HOURLY_RETENTION = timedelta(days=7)
+DAILY_RETENTION = timedelta(days=90)
+# Velocity is measured against the oldest raw snapshot in this window. It spans the
+# longest subreddit poll interval (an hour), so slowly polled posts still have a baseline.
+VELOCITY_WINDOW = timedelta(hours=2)
+# Baselines younger than this are skipped: a few points over seconds is noise, not a rate.
+MIN_VELOCITY_ELAPSED = timedelta(minutes=15)
+DELETE_CHUNK_SIZE = 1000
+
+
+def delete_in_chunks(queryset, chunk_size=DELETE_CHUNK_SIZE):
+    """
+    Delete the rows of a queryset in bounded primary-key batches, so no single
+    statement locks or rewrites the whole table.
+    """
+    model = queryset.model
+    deleted_total = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return deleted_total
+        deleted, _ = model.objects.filter(pk__in=pks).delete()
+        deleted_total += deleted
+
+
+def record_snapshots(trends_data, captured_at=None):
+    """
+    Append one raw snapshot per fetched post.
+    """
+    captured_at = captured_at or timezone.now()
+    TrendSnapshot.objects.bulk_create([
+        TrendSnapshot(
+            post_id=trend['post_id'],
+            subreddit=trend['subreddit'],
+            category=trend['category'],
+            score=trend['volume'],
+            num_comments=trend['num_comments'],
+            upvote_ratio=trend['upvote_ratio'],
+            captured_at=captured_at,
+        )
+        for trend in trends_data
+    ], ignore_conflicts=True)
+    return captured_at
+
+
+def calculate_growth_from_velocity(score, baseline_score, hours):
+    """
+    Percentage score growth per hour between a baseline snapshot and now.
+    """
+    return ((score - baseline_score) / max(baseline_score, 1)) * 100 / hours
+
+
+def score_velocity(trends_data, captured_at):
+    """
+    Return {post_id: velocity} for posts that have a raw snapshot inside the
+    velocity window and at least MIN_VELOCITY_ELAPSED before captured_at.
+    Served by the (post_id, resolution, captured_at) index.
+    """
+    baselines = {}
+    rows = TrendSnapshot.objects.filter(
+        post_id__in=[trend['post_id'] for trend in trends_data],
+        resolution='raw',
+        captured_at__gte=captured_at - VELOCITY_WINDOW,
+        captured_at__lte=captured_at - MIN_VELOCITY_ELAPSED,
+    ).order_by('post_id', 'captured_at').values_list('post_id', 'score', 'captured_at')
+    for post_id, score, snapshot_at in rows:
+        baselines.setdefault(post_id, (score, snapshot_at))
+
+    velocity = {}
+    for trend in trends_data:
+        baseline = baselines.get(trend['post_id'])
+        if baseline:
+            baseline_score, snapshot_at = baseline
+            hours = (captured_at - snapshot_at).total_seconds() / 3600
+            velocity[trend['post_id']] = calculate_growth_from_velocity(trend['volume'], baseline_score, hours)
+    return velocity
+
+
+def _rollup(source, target, trunc, cutoff):
+    """
+    Downsample `source` snapshots older than cutoff into one `target` row per
+    post and bucket, then delete the source rows in chunks.
+    """
+    old_rows = TrendSnapshot.objects.filter(resolution=source, captured_at__lt=cutoff)
+    buckets = old_rows.annotate(bucket=trunc('captured_at', tzinfo=dt_timezone.utc)).values(
+        'post_id', 'subreddit', 'category', 'bucket',
+    ).annotate(
+        max_score=Max('score'),
+        max_comments=Max('num_comments'),
+        avg_ratio=Avg('upvote_ratio'),
+    ).order_by()
+
+    with transaction.atomic():
+        TrendSnapshot.objects.bulk_create([
+            TrendSnapshot(
+                post_id=row['post_id'],
+                subreddit=row['subreddit'],
+                category=row['category'],
+                score=row['max_score'],
+                num_comments=row['max_comments'],
+                upvote_ratio=row['avg_ratio'],
+                captured_at=row['bucket'],
+                resolution=target,
+            )
+            for row in buckets
+        ], batch_size=DELETE_CHUNK_SIZE, ignore_conflicts=True)
+    return delete_in_chunks(old_rows)
+
+
+def rollup_trend_snapshots():
+    """
+    Roll raw snapshots up to hourly, hourly up to daily, and drop daily rows past retention.
+    Cutoffs are aligned to bucket boundaries so a bucket is never split across runs.
+    """
+    now = timezone.now()
+    hour_cutoff = (now - RAW_RETENTION).replace(minute=0, second=0, microsecond=0)
+    day_cutoff = (now - HOURLY_RETENTION).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    rolled_raw = _rollup('raw', 'hour', TruncHour, hour_cutoff)
+    rolled_hourly = _rollup('hour', 'day', TruncDay, day_cutoff)
+    expired = delete_in_chunks(TrendSnapshot.objects.filter(resolution='day', captured_at__lt=now - DAILY_RETENTION))
+    return {'raw': rolled_raw, 'hour': rolled_hourly, 'day': expired}
@@ -0,0 +1,20 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from trend_analysisapp.utils import run_trend_refresher, TREND_REFRESH_INTERVAL
+
+
+class Command(BaseCommand):
+    help = "Continuously refresh Reddit trends, reusing one Reddit client between refreshes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=TREND_REFRESH_INTERVAL,
+                            help="Seconds to wait between refreshes.")
+        parser.add_argument('--once', action='store_true', help="Run a single refresh and exit.")
+
+    def handle(self, *args, **options):
+        try:
+            asyncio.run(run_trend_refresher(interval=options['interval'], once=options['once']))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Trend refresher stopped."))
@@ -1,6 +1,19 @@
+import hashlib
 from django.db import models
 from django.utils.timezone import now
 
+
+def make_trend_key(post_id=None, subreddit=None, title=None):
+    """
+    Fixed-width identity for a trend: the Reddit fullname when the post id is
+    known, otherwise a SHA-256 of (subreddit, title).
+    """
+    if post_id:
+        return "t3_{}".format(post_id)
+    raw = "{}\x00{}".format(subreddit or '', title or '')
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
 class Trend(models.Model):
     CATEGORY_CHOICES = [
         ('technology', 'Technology'),
@@ -16,19 +29,109 @@ class Trend(models.Model):
         ('india', 'India'),
     ]
     
-    name = models.TextField(unique=True)
+    # Upserts go through the short, fixed-width key instead of a unique index on the title text.
+    # Null only for rows stored before keys existed; those age out with remove_outdated_trends.
+    key = models.CharField(max_length=64, unique=True, null=True, editable=False)
+    name = models.TextField()
     volume = models.PositiveIntegerField()
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
     region = models.CharField(max_length=50, choices=REGION_CHOICES)
-    growth = models.FloatField(default=0.0)
+    growth = models.FloatField(default=0.0)  # Score growth in % per hour between refreshes, see score_velocity
     sentiment = models.FloatField(default=0.0)
     
     # New fields for additional insights:
     created_at = models.DateTimeField(default=now)  # Post creation time
     popularity = models.FloatField(default=0.0)  # Calculated popularity (score per time unit)
+    hot_score = models.FloatField(default=0.0)  # Time-decayed rank, see calculate_hot_score
     num_comments = models.PositiveIntegerField(default=0)  # Total number of comments
     image_url = models.URLField(null=True, blank=True)  # URL of the image if available
     subreddit = models.CharField(max_length=50)  # The subreddit the post came from
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'region', '-growth', '-id'], name='trend_cat_region_growth_idx'),
+            models.Index(fields=['-growth', '-id'], name='trend_growth_idx'),
+            models.Index(fields=['category', 'region', '-hot_score', '-id'], name='trend_cat_region_hot_idx'),
+            models.Index(fields=['-hot_score', '-id'], name='trend_hot_idx'),
+        ]
+
     def __str__(self):
         return "{} ({})".format(self.name, self.region)
+
+class TitleSentiment(models.Model):
+    """
+    Persisted sentiment scores keyed by a SHA-256 hash of the post title,
+    so titles seen in earlier refreshes are never scored twice.
+    """
+    title_hash = models.CharField(max_length=64, unique=True)
+    polarity = models.FloatField()
+    scored_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return "{} ({})".format(self.title_hash[:12], self.polarity)
+
+class TrendSnapshot(models.Model):
+    """
+    Append-only history of a Reddit post's metrics. Each refresh adds a 'raw'
+    row per post; old rows are rolled up into 'hour' and then 'day' rows.
+    """
+    RESOLUTION_CHOICES = [
+        ('raw', 'Raw'),
+        ('hour', 'Hourly'),
+        ('day', 'Daily'),
+    ]
+
+    post_id = models.CharField(max_length=20)  # Reddit post id
+    subreddit = models.CharField(max_length=50)
+    category = models.CharField(max_length=50, choices=Trend.CATEGORY_CHOICES)
+    score = models.IntegerField()
+    num_comments = models.PositiveIntegerField(default=0)
+    upvote_ratio = models.FloatField(default=0.0)
+    captured_at = models.DateTimeField(default=now)
+    resolution = models.CharField(max_length=4, choices=RESOLUTION_CHOICES, default='raw')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post_id', 'resolution', 'captured_at'], name='unique_trend_snapshot'),
+        ]
+        indexes = [
+            models.Index(fields=['resolution', 'captured_at'], name='trend_snapshot_rollup_idx'),
+        ]
+
+    def __str__(self):
+        return "{} @ {} ({})".format(self.post_id, self.captured_at, self.resolution)
+
+class SubredditWatermark(models.Model):
+    """
+    What the last poll of a subreddit's hot listing returned, and when to poll it next.
+    """
+    subreddit = models.CharField(max_length=50, unique=True)
+    seen_posts = models.JSONField(default=dict, blank=True)  # Reddit post id -> [score, num_comments]
+    interval = models.PositiveIntegerField(default=300)  # Seconds between polls, adapted to churn
+    last_polled_at = models.DateTimeField(null=True, blank=True)
+    next_poll_at = models.DateTimeField(default=now)
+
+    def __str__(self):
+        return "r/{} (every {}s)".format(self.subreddit, self.interval)
+
+class TrendAggregate(models.Model):
+    """
+    Precomputed per-subreddit and per-category totals, rebuilt after every refresh.
+    Category-wide rows have an empty subreddit.
+    """
+    category = models.CharField(max_length=50, choices=Trend.CATEGORY_CHOICES)
+    subreddit = models.CharField(max_length=50, blank=True, default='')
+    trend_count = models.PositiveIntegerField(default=0)
+    total_volume = models.BigIntegerField(default=0)
+    total_comments = models.BigIntegerField(default=0)
+    avg_sentiment = models.FloatField(default=0.0)
+    avg_growth = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(default=now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'subreddit'], name='unique_trend_aggregate'),
+        ]
+
+    def __str__(self):
+        return "{} / {}".format(self.category, self.subreddit or 'all')
@@ -0,0 +1,101 @@
+import json
+import base64
+import hashlib
+from collections import OrderedDict
+
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .cache import trend_cache, get_trend_version
+
+
+class TrendCursorPagination(BasePagination):
+    """
+    Keyset pagination over (ordering_field, id), both descending.
+
+    Each page is a single indexed range scan, so deep pages cost the same as the
+    first one and rows inserted by a refresh never shift an in-progress scroll.
+    A total is only computed when the client asks for it with ?count=true, and
+    then it is approximate and cached.
+    """
+    page_size = 10
+    ordering_field = 'growth'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    count_cache_timeout = 300
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_queryset = queryset
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            value, pk = position
+            queryset = queryset.filter(
+                Q(**{f'{self.ordering_field}__lt': value}) |
+                Q(**{self.ordering_field: value, 'id__lt': pk})
+            )
+        queryset = queryset.order_by(f'-{self.ordering_field}', '-id')
+
+        # Fetch one extra row to know whether a next page exists, without a COUNT(*).
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        payload = OrderedDict([('next', self.get_next_link())])
+        if self.request.query_params.get(self.count_query_param, '').lower() in ('true', '1', 'yes'):
+            payload['count'] = self.get_approximate_count()
+        payload['results'] = data
+        return Response(payload)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        cursor = self.encode_cursor(getattr(last, self.ordering_field), last.pk)
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def encode_cursor(self, value, pk):
+        raw = json.dumps([value, pk]).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            return float(value), int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound("Invalid cursor.")
+
+    def get_approximate_count(self):
+        queryset = self.base_queryset
+        query_key = hashlib.sha1(str(queryset.query).encode('utf-8')).hexdigest()
+        version, _ = get_trend_version()
+        cache_key = f'count:{query_key}'
+        count = trend_cache.get(cache_key, version=version)
+        if count is None:
+            count = self._estimate_count(queryset)
+            trend_cache.set(cache_key, count, self.count_cache_timeout, version=version)
+        return count
+
+    def _estimate_count(self, queryset):
+        connection = connections[queryset.db]
+        # An unfiltered listing on PostgreSQL can use the planner's row estimate instead of a scan.
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= 0:
+                return row[0]
+        return queryset.count()
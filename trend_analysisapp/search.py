@@ -0,0 +1,113 @@
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+from django.db.utils import DatabaseError
+
+from .models import Trend
+
+TREND_TABLE = Trend._meta.db_table
+FTS_TABLE = f'{TREND_TABLE}_fts'
+
+# SQLite: an external-content FTS5 table kept in sync with the trend table by triggers. The trigram
+# tokenizer (SQLite 3.34+) gives case-insensitive substring matches, the same results as icontains.
+SQLITE_DROP_SEARCH_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+SQLITE_SEARCH_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(name, content='{TREND_TABLE}', content_rowid='id', tokenize='trigram')",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TREND_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TREND_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name ON {TREND_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+# PostgreSQL: a tsvector expression index for word search and a trigram index for substring search.
+POSTGRES_SEARCH_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS trend_name_tsv_idx ON {TREND_TABLE} USING gin (to_tsvector('english', name))",
+    f"CREATE INDEX IF NOT EXISTS trend_name_trgm_idx ON {TREND_TABLE} USING gin (UPPER(name) gin_trgm_ops)",
+]
+
+_fts_available = {}
+
+def ensure_search_index(using=DEFAULT_DB_ALIAS):
+    """
+    Create the database specific search index for trend names. Safe to run repeatedly.
+    """
+    connection = connections[using]
+    statements = {
+        'sqlite': SQLITE_SEARCH_SQL,
+        'postgresql': POSTGRES_SEARCH_SQL,
+    }.get(connection.vendor)
+    if not statements:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute("SELECT sql FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+                row = cursor.fetchone()
+                if row and 'trigram' not in row[0]:
+                    # Built by an earlier version with the word tokenizer; rebuild it.
+                    statements = SQLITE_DROP_SEARCH_SQL + statements
+            for statement in statements:
+                cursor.execute(statement)
+    except DatabaseError as e:
+        # e.g. SQLite without FTS5/trigram or no permission to create pg_trgm: keep the LIKE fallback.
+        print(f"Unable to create trend search index: {str(e)}")
+        return False
+    _fts_available.pop(using, None)
+    return True
+
+def _sqlite_fts_available(connection):
+    if connection.alias not in _fts_available:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+            _fts_available[connection.alias] = cursor.fetchone() is not None
+    return _fts_available[connection.alias]
+
+def _fts_query(search_query):
+    # Quote the whole query as one string, so user input can never be parsed as FTS syntax.
+    # Trigrams cannot match fewer than three characters; those fall back to LIKE.
+    search_query = search_query.strip()
+    if len(search_query) < 3:
+        return None
+    return '"{}"'.format(search_query.replace('"', '""'))
+
+def search_trends(queryset, search_query):
+    """
+    Filter a Trend queryset by a free-text query using the best index available:
+    trigram FTS5 on SQLite, tsvector/trigram on PostgreSQL and a plain LIKE elsewhere.
+    """
+    connection = connections[queryset.db]
+
+    if connection.vendor == 'sqlite' and _sqlite_fts_available(connection):
+        fts_query = _fts_query(search_query)
+        if not fts_query:
+            return queryset.filter(name__icontains=search_query)
+        return queryset.filter(RawSQL(
+            f'"{TREND_TABLE}"."id" IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)',
+            [fts_query],
+            output_field=BooleanField(),
+        ))
+
+    if connection.vendor == 'postgresql':
+        # Word matches use the tsvector index; substring matches use the trigram index on UPPER(name).
+        return queryset.filter(
+            Q(RawSQL(
+                f"""to_tsvector('english', "{TREND_TABLE}"."name") @@ plainto_tsquery('english', %s)""",
+                [search_query],
+                output_field=BooleanField(),
+            )) | Q(name__icontains=search_query)
+        )
+
+    return queryset.filter(name__icontains=search_query)
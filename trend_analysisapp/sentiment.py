@@ -0,0 +1,88 @@
+import os
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from .db import db_sync_to_async
+from .models import TitleSentiment
+from .sentiment_worker import score_titles
+
+SENTIMENT_WORKERS = int(os.getenv('SENTIMENT_WORKERS', 2))
+SENTIMENT_CACHE_SIZE = int(os.getenv('SENTIMENT_CACHE_SIZE', 5000))
+
+# In-process LRU of title hash -> polarity, shared by every refresh in this process.
+_score_cache = OrderedDict()
+_score_cache_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+
+def title_hash(title):
+    return hashlib.sha256(title.encode('utf-8')).hexdigest()
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=SENTIMENT_WORKERS)
+        return _executor
+
+def _cache_get_many(hashes):
+    found = {}
+    with _score_cache_lock:
+        for key in hashes:
+            if key in _score_cache:
+                _score_cache.move_to_end(key)
+                found[key] = _score_cache[key]
+    return found
+
+def _cache_set_many(scores):
+    with _score_cache_lock:
+        for key, polarity in scores.items():
+            _score_cache[key] = polarity
+            _score_cache.move_to_end(key)
+        while len(_score_cache) > SENTIMENT_CACHE_SIZE:
+            _score_cache.popitem(last=False)
+
+def _load_persisted_scores(hashes):
+    return dict(TitleSentiment.objects.filter(title_hash__in=hashes).values_list('title_hash', 'polarity'))
+
+def _persist_scores(scores):
+    TitleSentiment.objects.bulk_create(
+        [TitleSentiment(title_hash=key, polarity=polarity) for key, polarity in scores.items()],
+        ignore_conflicts=True,
+    )
+
+async def score_sentiments(titles):
+    """
+    Return a {title: polarity} mapping for the given titles.
+    Scores come from the LRU, then the persisted cache; only unseen titles are
+    scored, in batches on the process pool so the event loop is never blocked.
+    """
+    hashes = {title: title_hash(title) for title in set(titles)}
+    scores = _cache_get_many(hashes.values())
+
+    missing = [key for key in hashes.values() if key not in scores]
+    if missing:
+        persisted = await db_sync_to_async(_load_persisted_scores)(missing)
+        _cache_set_many(persisted)
+        scores.update(persisted)
+
+    unscored = [title for title, key in hashes.items() if key not in scores]
+    if unscored:
+        loop = asyncio.get_running_loop()
+        executor = get_executor()
+        chunk_size = -(-len(unscored) // SENTIMENT_WORKERS)
+        chunks = [unscored[i:i + chunk_size] for i in range(0, len(unscored), chunk_size)]
+        results = await asyncio.gather(*(loop.run_in_executor(executor, score_titles, chunk) for chunk in chunks))
+        new_scores = {
+            hashes[title]: polarity
+            for chunk, polarities in zip(chunks, results)
+            for title, polarity in zip(chunk, polarities)
+        }
+        _cache_set_many(new_scores)
+        await db_sync_to_async(_persist_scores)(new_scores)
+        scores.update(new_scores)
+
+    return {title: scores[key] for title, key in hashes.items()}
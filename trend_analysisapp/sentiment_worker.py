@@ -0,0 +1,12 @@
+from textblob import TextBlob
+
+# Runs inside the sentiment process pool. Kept free of Django imports: under the
+# spawn and forkserver start methods each worker imports this module from scratch,
+# before (and without) django.setup().
+
+
+def score_titles(titles):
+    """
+    Compute TextBlob polarity for a batch of titles.
+    """
+    return [TextBlob(title).sentiment.polarity for title in titles]
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Trend
+from .models import Trend, TrendAggregate
 
 class TrendSerializer(serializers.ModelSerializer):
     class Meta:
@@ -10,3 +10,11 @@ class TrendSerializer(serializers.ModelSerializer):
             'created_at', 'popularity', 'num_comments',
             'image_url', 'subreddit',
         ]
+
+class TrendAggregateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TrendAggregate
+        fields = [
+            'category', 'subreddit', 'trend_count', 'total_volume',
+            'total_comments', 'avg_sentiment', 'avg_growth', 'updated_at',
+        ]
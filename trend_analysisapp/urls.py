@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import TrendAnalysisView, RefreshTrendView
+from .views import TrendAnalysisView, RefreshTrendView, TrendAggregateView, TrendStreamView
 
 urlpatterns = [
     path('trending/', TrendAnalysisView.as_view(), name='Trend Analysis'),
     path('trending/refresh/', RefreshTrendView.as_view(), name='Refresh Trends'),
+    path('trending/aggregates/', TrendAggregateView.as_view(), name='Trend Aggregates'),
+    path('trending/stream/', TrendStreamView.as_view(), name='Trend Stream'),
 ]
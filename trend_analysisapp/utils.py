@@ -1,13 +1,25 @@
 import asyncpraw
+import aiohttp
 import os
+import math
+import time
 import asyncio
 from datetime import datetime, timedelta, timezone as dt_timezone
-from textblob import TextBlob
 from dotenv import load_dotenv
-from asyncprawcore.exceptions import RequestException
+from asyncprawcore.exceptions import RequestException, TooManyRequests
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
-from .models import Trend
+from .models import Trend, make_trend_key
+from .sentiment import score_sentiments
+from .cache import bump_trend_version
+from .watermarks import load_watermarks, is_due, filter_changed_posts, advance_watermark, save_watermarks
+from .aggregates import refresh_trend_aggregates
+from .history import record_snapshots, score_velocity, rollup_trend_snapshots, DELETE_CHUNK_SIZE
+from .events import group_changes, publish_trend_changes
+from .db import db_sync_to_async
 
 load_dotenv()
 
@@ -15,6 +27,16 @@ REDDIT_CLIENT_ID = os.getenv('REDDIT_CLIENT_ID')
 REDDIT_CLIENT_SECRET = os.getenv('REDDIT_CLIENT_SECRET')
 REDDIT_USER_AGENT = os.getenv('REDDIT_USER_AGENT')
 
+# Reddit allows 100 OAuth requests per minute per client; stay comfortably below it.
+REDDIT_REQUESTS_PER_MINUTE = int(os.getenv('REDDIT_REQUESTS_PER_MINUTE', 60))
+REDDIT_MAX_CONCURRENCY = int(os.getenv('REDDIT_MAX_CONCURRENCY', 4))
+REDDIT_REQUEST_TIMEOUT = int(os.getenv('REDDIT_REQUEST_TIMEOUT', 30))
+# How often the refresher wakes up to poll the subreddits that are due.
+TREND_REFRESH_INTERVAL = int(os.getenv('TREND_REFRESH_INTERVAL', 300))
+# Bounded queue between the subreddit fetchers and the sentiment/DB stages.
+PIPELINE_QUEUE_SIZE = int(os.getenv('TREND_PIPELINE_QUEUE_SIZE', 50))
+PIPELINE_BATCH_SIZE = int(os.getenv('TREND_PIPELINE_BATCH_SIZE', 20))
+
 # Each category now maps to a list of subreddits.
 CATEGORY_SUBREDDITS = {
     'technology': ['technology', 'gadgets', 'programming'],
@@ -25,15 +47,70 @@ CATEGORY_SUBREDDITS = {
     'gaming': ['gaming', 'pcgaming', 'console'],
 }
 
+class RedditRateBudget:
+    """
+    Async token bucket that spreads Reddit calls over the per-minute quota.
+    Each caller reserves a slot under the lock and sleeps outside of it.
+    """
+    def __init__(self, requests_per_minute, burst=1):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.last_check = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            current = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (current - self.last_check) * self.rate)
+            self.last_check = current
+            self.tokens -= 1.0
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+        if delay:
+            await asyncio.sleep(delay)
+
 def create_reddit_instance():
-    return asyncpraw.Reddit(
+    """
+    Create a Reddit client backed by a keep-alive connection pool.
+    Must be called from inside a running event loop; the client (and its OAuth
+    token) can be reused for as long as that loop is alive.
+    """
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=REDDIT_MAX_CONCURRENCY, keepalive_timeout=75),
+        timeout=aiohttp.ClientTimeout(total=REDDIT_REQUEST_TIMEOUT),
+    )
+    reddit = asyncpraw.Reddit(
         client_id=REDDIT_CLIENT_ID,
         client_secret=REDDIT_CLIENT_SECRET,
         user_agent=REDDIT_USER_AGENT,
+        requestor_kwargs={'session': session},
     )
+    # Bound concurrency and request rate for every fetch made through this client.
+    reddit.trend_semaphore = asyncio.Semaphore(REDDIT_MAX_CONCURRENCY)
+    reddit.trend_budget = RedditRateBudget(REDDIT_REQUESTS_PER_MINUTE, burst=REDDIT_MAX_CONCURRENCY)
+    return reddit
+
+def calculate_hot_score(score, created_at, half_life_hours=None):
+    """
+    Rank key for a score that halves every half-life: log2(score) + age bonus.
+    Ordering by this is the same as ordering by score * 0.5 ** (age / half_life)
+    at any moment, but the value only changes when the score does, so it can be
+    stored and indexed instead of recomputed per row at query time.
+    """
+    half_life_hours = half_life_hours or settings.TREND_HOT_HALF_LIFE_HOURS
+    return math.log2(max(score, 1)) + created_at.timestamp() / (half_life_hours * 3600)
 
-def calculate_growth_from_upvote_ratio(current_ratio, benchmark_ratio=0.90):
-    return ((current_ratio - benchmark_ratio) / benchmark_ratio) * 100
+def recompute_hot_scores():
+    """
+    Recompute every stored hot score, e.g. after TREND_HOT_HALF_LIFE_HOURS changes.
+    """
+    trends = list(Trend.objects.only('id', 'volume', 'created_at'))
+    for trend in trends:
+        trend.hot_score = calculate_hot_score(trend.volume, trend.created_at)
+    Trend.objects.bulk_update(trends, ['hot_score'], batch_size=500)
+    if trends:
+        bump_trend_version()
+    return len(trends)
 
 async def fetch_subreddit_trend(reddit, category, subreddit_name):
     """
@@ -41,30 +118,33 @@ async def fetch_subreddit_trend(reddit, category, subreddit_name):
     """
     subreddit_data = await reddit.subreddit(subreddit_name)
     trends = []
-    async for post in subreddit_data.hot(limit=5):
+    # One listing request per subreddit: wait for a slot and a share of the rate budget.
+    async with reddit.trend_semaphore:
+        await reddit.trend_budget.acquire()
+        posts = [post async for post in subreddit_data.hot(limit=5)]
+    for post in posts:
         upvote_ratio = post.upvote_ratio
-        growth = calculate_growth_from_upvote_ratio(upvote_ratio, benchmark_ratio=0.90)
-        
+
         # Create a timezone-aware datetime using Python's built-in timezone (UTC).
         created_at_dt = datetime.fromtimestamp(post.created_utc, tz=dt_timezone.utc)
         # Calculate time since creation in minutes using Django's timezone.now() for current time.
         time_since_creation = (timezone.now() - created_at_dt).total_seconds() / 60
         
-        title_sentiment = TextBlob(post.title).sentiment.polarity
         popularity = post.score / (time_since_creation + 1)
         
         # Check if the post is an image.
         image_url = post.url if hasattr(post, 'post_hint') and post.post_hint == 'image' else None
         
         trends.append({
+            'post_id': post.id,
             'name': post.title,
             'category': category,
             'volume': post.score,
             'region': 'Global',
-            'growth': growth,
             'created_at': created_at_dt,
-            'sentiment': title_sentiment,
+            'sentiment': None,  # Filled in by the batched sentiment stage.
             'num_comments': post.num_comments,
+            'upvote_ratio': upvote_ratio,
             'popularity': popularity,
             'subreddit': subreddit_name,
             'image_url': image_url,
@@ -78,59 +158,209 @@ async def safe_fetch_subreddit_trend(reddit, category, subreddit_name, retries=3
     for attempt in range(retries):
         try:
             return await fetch_subreddit_trend(reddit, category, subreddit_name)
-        except RequestException as e:
+        except (RequestException, TooManyRequests) as e:
             if attempt < retries - 1:
                 await asyncio.sleep(delay)
                 delay *= 2  # Exponential backoff
             else:
                 raise e
 
-async def fetch_reddit_trend():
+async def fetch_into_queue(reddit, category, subreddit_name, watermark, polled_at, queue):
     """
-    Iterate through all subreddits in each category and aggregate the trends.
+    Producer: fetch one subreddit and push its changed posts onto the queue,
+    followed by its advanced watermark so it is saved after those posts.
     """
-    reddit = create_reddit_instance()
     try:
-        tasks = []
-        for category, subreddits in CATEGORY_SUBREDDITS.items():
-            for subreddit_name in subreddits:
-                tasks.append(safe_fetch_subreddit_trend(reddit, category, subreddit_name))
-        all_trends = await asyncio.gather(*tasks)
-        # Flatten the list of trends (each task returns a list of posts).
-        return [trend for trends in all_trends for trend in trends]
+        trends = await safe_fetch_subreddit_trend(reddit, category, subreddit_name)
+    except Exception as e:
+        # The watermark is not advanced, so this subreddit is retried on the next poll.
+        print(f"Error fetching r/{subreddit_name}: {str(e)}")
+        return
+    # Skip unchanged posts before any sentiment scoring or DB writes.
+    changed = filter_changed_posts(trends, watermark)
+    for trend in changed:
+        await queue.put(trend)
+    await queue.put(advance_watermark(watermark, subreddit_name, trends, len(changed), polled_at))
+
+async def next_batch(queue, batch_size):
+    """
+    Wait for at least one item, then drain whatever is ready up to batch_size.
+    Returns (items, done) where done means the end-of-stream marker was seen.
+    """
+    items = [await queue.get()]
+    while len(items) < batch_size and not queue.empty():
+        items.append(queue.get_nowait())
+    if items[-1] is None:
+        return items[:-1], True
+    return items, False
+
+async def score_batches(fetch_queue, write_queue):
+    """
+    Sentiment stage: score each batch of posts on the process pool and pass it on.
+    """
+    done = False
+    while not done:
+        items, done = await next_batch(fetch_queue, PIPELINE_BATCH_SIZE)
+        trends = [item for item in items if isinstance(item, dict)]
+        if trends:
+            sentiments = await score_sentiments([trend['name'] for trend in trends])
+            for trend in trends:
+                trend['sentiment'] = sentiments[trend['name']]
+        await write_queue.put(items)
+    await write_queue.put(None)
+
+async def write_batches(write_queue):
+    """
+    DB stage: store each scored batch together with the watermarks it completes.
+    Returns the (new, updated) trend pairs of the whole refresh.
+    """
+    new, updated = [], []
+    while True:
+        items = await write_queue.get()
+        if items is None:
+            return new, updated
+        trends = [item for item in items if isinstance(item, dict)]
+        watermarks = [item for item in items if not isinstance(item, dict)]
+        batch_new, batch_updated = await db_sync_to_async(store_trends)(trends, watermarks, bump_version=False)
+        new.extend(batch_new)
+        updated.extend(batch_updated)
+
+async def refresh_reddit_trends(reddit=None, force=False):
+    """
+    Streaming refresh: subreddit fetchers feed a bounded queue that a sentiment
+    stage and a DB writer consume in batches, so network, CPU and DB work
+    overlap and one slow subreddit does not hold back the others.
+    Only subreddits that are due are polled unless forced. Returns the number
+    of trends stored. A long-lived client may be passed in; otherwise a
+    temporary one is created and closed.
+    """
+    owns_client = reddit is None
+    if owns_client:
+        reddit = create_reddit_instance()
+    try:
+        watermarks = await db_sync_to_async(load_watermarks)()
+        polled_at = timezone.now()
+        fetch_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        write_queue = asyncio.Queue(maxsize=2)
+
+        async def produce():
+            await asyncio.gather(*(
+                fetch_into_queue(reddit, category, subreddit_name, watermarks.get(subreddit_name), polled_at, fetch_queue)
+                for category, subreddits in CATEGORY_SUBREDDITS.items()
+                for subreddit_name in subreddits
+                if force or is_due(watermarks.get(subreddit_name), polled_at)
+            ))
+            await fetch_queue.put(None)
+
+        stages = [
+            asyncio.create_task(produce()),
+            asyncio.create_task(score_batches(fetch_queue, write_queue)),
+            asyncio.create_task(write_batches(write_queue)),
+        ]
+        try:
+            _, _, (new, updated) = await asyncio.gather(*stages)
+        finally:
+            # If any stage fails, stop the others instead of leaving them blocked on a queue.
+            for stage in stages:
+                stage.cancel()
+
+        stored = len(new) + len(updated)
+        if stored:
+            # One version bump and one change event per refresh, for caches and SSE clients.
+            await sync_to_async(bump_trend_version, thread_sensitive=False)()
+            await sync_to_async(publish_trend_changes, thread_sensitive=False)(group_changes(new=new, updated=updated))
+        return stored
     finally:
-        await reddit.close()
+        if owns_client:
+            await reddit.close()
 
-def fetch_and_update_trends():
+def fetch_and_update_trends(force=False):
     """
     Fetch trends from Reddit and update or create Trend records in the database.
     """
-    # Run the async function to fetch trends.
-    trends_data = asyncio.run(fetch_reddit_trend())
-    
+    return asyncio.run(refresh_reddit_trends(force=force))
+
+@transaction.atomic
+def store_trends(trends_data, watermarks=(), bump_version=True):
+    """
+    Snapshot the fetched posts, then update or create Trend records for them.
+    Growth is the score velocity against earlier snapshots: 0 until a post
+    has a baseline, then the latest measurement, kept while no new baseline
+    is available. Subreddit watermarks are
+    saved in the same transaction, so a failed write is retried next poll.
+    Returns (new, updated) lists of (trend id, category) pairs.
+    """
+    new, updated = [], []
+    save_watermarks(watermarks)
+    captured_at = record_snapshots(trends_data)
+    velocity = score_velocity(trends_data, captured_at)
     for trend in trends_data:
-        # Update or create the Trend record, using 'name' as a unique identifier.
-        Trend.objects.update_or_create(
-            name=trend['name'],
-            defaults={
-                'volume': trend['volume'],
-                'category': trend['category'],
-                'region': trend['region'],
-                'growth': trend['growth'],
-                'sentiment': trend['sentiment'],
-                'created_at': trend['created_at'],
-                'popularity': trend['popularity'],
-                'num_comments': trend['num_comments'],
-                'image_url': trend['image_url'],
-                'subreddit': trend['subreddit'],
-            }
+        defaults = {
+            'name': trend['name'],
+            'volume': trend['volume'],
+            'category': trend['category'],
+            'region': trend['region'],
+            'sentiment': trend['sentiment'],
+            'created_at': trend['created_at'],
+            'popularity': trend['popularity'],
+            'hot_score': calculate_hot_score(trend['volume'], trend['created_at']),
+            'num_comments': trend['num_comments'],
+            'image_url': trend['image_url'],
+            'subreddit': trend['subreddit'],
+        }
+        if trend['post_id'] in velocity:
+            defaults['growth'] = velocity[trend['post_id']]
+        # Update or create the Trend record, keyed by the Reddit post id.
+        obj, created = Trend.objects.update_or_create(
+            key=make_trend_key(trend['post_id'], trend['subreddit'], trend['name']),
+            defaults=defaults,
         )
+        (new if created else updated).append((obj.id, obj.category))
+    if trends_data and bump_version:
+        bump_trend_version()
+        publish_trend_changes(group_changes(new=new, updated=updated))
+    return new, updated
 
 def remove_outdated_trends():
     """
     Remove Trend records older than a certain threshold (e.g., 1 day).
+    Their history stays in TrendSnapshot; rows are deleted in bounded chunks.
     """
     threshold_date = timezone.now() - timedelta(days=1)
     outdated_trends = Trend.objects.filter(created_at__lt=threshold_date)
-    deleted_count, _ = outdated_trends.delete()
-    return deleted_count
+    removed = []
+    while True:
+        chunk = list(outdated_trends.values_list('id', 'category')[:DELETE_CHUNK_SIZE])
+        if not chunk:
+            break
+        Trend.objects.filter(pk__in=[pk for pk, _ in chunk]).delete()
+        removed.extend(chunk)
+    if removed:
+        bump_trend_version()
+        publish_trend_changes(group_changes(removed=removed))
+    return len(removed)
+
+async def run_trend_refresher(interval=TREND_REFRESH_INTERVAL, once=False):
+    """
+    Refresh trends forever (or once) with a single Reddit client kept alive across refreshes.
+    """
+    reddit = create_reddit_instance()
+    try:
+        # Stored hot scores depend on the configured half-life; refresh them once per process start.
+        await db_sync_to_async(recompute_hot_scores)()
+        while True:
+            try:
+                stored = await refresh_reddit_trends(reddit)
+                deleted_count = await db_sync_to_async(remove_outdated_trends)()
+                await db_sync_to_async(rollup_trend_snapshots)()
+                await db_sync_to_async(refresh_trend_aggregates)()
+                print(f"Refreshed {stored} trends, removed {deleted_count} outdated trends.")
+            except Exception as e:
+                if once:
+                    raise
+                print(f"Error refreshing trends: {str(e)}")
+            if once:
+                return
+            await asyncio.sleep(interval)
+    finally:
+        await reddit.close()
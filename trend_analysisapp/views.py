@@ -1,43 +1,137 @@
+import asyncio
+from django.http import StreamingHttpResponse
+from django.views import View
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.pagination import PageNumberPagination
-from .models import Trend
-from .serializers import TrendSerializer
+from .models import Trend, TrendAggregate
+from .serializers import TrendSerializer, TrendAggregateSerializer
 from .utils import fetch_and_update_trends, remove_outdated_trends
+from .history import rollup_trend_snapshots
+from .aggregates import refresh_trend_aggregates
+from .events import broadcaster, event_for_category, format_sse
+from .search import search_trends
+from .pagination import TrendCursorPagination
+from .cache import (
+    TREND_LISTING_TIMEOUT, trend_cache, get_trend_version, listing_params_key, listing_cache_key,
+    listing_etag, is_not_modified, set_validator_headers,
+)
 from rest_framework.permissions import AllowAny
 
 class TrendAnalysisView(APIView):
     permission_classes = [AllowAny]
     def get(self, request):
+        version, last_modified = get_trend_version()
+        params_key = listing_params_key(request)
+        etag = listing_etag(version, params_key)
+
+        if is_not_modified(request, etag, last_modified):
+            return set_validator_headers(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+
+        # Serialized pages are cached per (trend version, query); a refresh bumps the version.
+        cache_key = listing_cache_key(params_key)
+        data = trend_cache.get(cache_key, version=version)
+        if data is None:
+            data = self.build_listing(request)
+            trend_cache.set(cache_key, data, TREND_LISTING_TIMEOUT, version=version)
+
+        return set_validator_headers(Response(data, status=status.HTTP_200_OK), etag, last_modified)
+
+    def build_listing(self, request):
         search_query = request.query_params.get('search', None)
         category_filter = request.query_params.get('category', None)
         region_filter = request.query_params.get('region', None)
+        order = request.query_params.get('order', '').lower()
         
         trends = Trend.objects.all()
         
         if search_query:
-            trends = trends.filter(name__icontains=search_query)
+            trends = search_trends(trends, search_query)
         if category_filter:
             trends = trends.filter(category=category_filter.lower())
         if region_filter:
             trends = trends.filter(region=region_filter)
-                    
-        trends = trends.order_by('-growth')
         
-        paginator = PageNumberPagination()
-        paginator.page_size = 10  # Display 10 trends per page
+        # Ordering by (-growth, -id), or (-hot_score, -id) for ?order=hot, is applied by the keyset paginator.
+        paginator = TrendCursorPagination()
+        if order == 'hot':
+            paginator.ordering_field = 'hot_score'
         paginated_trends = paginator.paginate_queryset(trends, request)
             
         serializer = TrendSerializer(paginated_trends, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        return paginator.get_paginated_response(serializer.data).data
+
+class TrendAggregateView(APIView):
+    permission_classes = [AllowAny]
+    def get(self, request):
+        # Reads the precomputed summary rows; ?category= narrows to one category.
+        category_filter = request.query_params.get('category', None)
+        aggregates = TrendAggregate.objects.all()
+        if category_filter:
+            aggregates = aggregates.filter(category=category_filter.lower())
+
+        aggregates = aggregates.order_by('category', 'subreddit')
+        serializer = TrendAggregateSerializer(aggregates, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+class TrendStreamView(View):
+    """
+    Server-sent events: pushes a compact diff of new, updated and removed trend
+    ids after each refresh. ?category= limits the stream to one category, and
+    a reconnecting client replays what it missed via Last-Event-ID.
+    Served asynchronously, so idle connections only hold a small queue.
+    """
+    heartbeat_interval = 15
+
+    async def get(self, request):
+        category = request.GET.get('category', '').lower() or None
+        last_event_id = request.headers.get('Last-Event-ID', '')
+        last_sent = int(last_event_id) if last_event_id.isdigit() else None
+        return self.build_response(self.stream(category, last_sent))
+
+    def build_response(self, stream):
+        response = StreamingHttpResponse(stream, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Stop proxies from buffering the stream
+        return response
+
+    async def stream(self, category, last_sent):
+        queue = broadcaster.subscribe()
+        # Events replayed here may also arrive through the queue; skip those.
+        replayed = set()
+        try:
+            yield 'retry: 5000\n\n'
+            if last_sent is not None:
+                missed = await broadcaster.read_events(last_sent, await broadcaster.current_seq())
+                for event in missed:
+                    replayed.add(event['id'])
+                    event = event_for_category(event, category)
+                    if event:
+                        yield format_sse(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                if event['id'] in replayed:
+                    continue
+                event = event_for_category(event, category)
+                if event:
+                    yield format_sse(event)
+        finally:
+            broadcaster.unsubscribe(queue)
 
 class RefreshTrendView(APIView):
     permission_classes = [AllowAny]
     def get(self, request):
         try:
-            fetch_and_update_trends()
+            # Only subreddits that are due are polled unless ?force=true.
+            force = request.query_params.get('force', '').lower() in ('true', '1', 'yes')
+            fetch_and_update_trends(force=force)
             deleted_count = remove_outdated_trends()
+            rollup_trend_snapshots()
+            refresh_trend_aggregates()
     
             return Response({'message': f'Trends updated successfully! {deleted_count} outdated trends removed.'}, status=status.HTTP_200_OK)
         except Exception as e:
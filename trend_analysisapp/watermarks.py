@@ -0,0 +1,62 @@
+import os
+from datetime import timedelta
+
+from .models import SubredditWatermark
+
+SUBREDDIT_MIN_INTERVAL = int(os.getenv('SUBREDDIT_MIN_INTERVAL', 300))
+SUBREDDIT_MAX_INTERVAL = int(os.getenv('SUBREDDIT_MAX_INTERVAL', 3600))
+# A poll where at least this share of the listing changed halves the interval.
+HIGH_CHURN_RATIO = 0.5
+
+
+def load_watermarks():
+    """
+    Return {subreddit: SubredditWatermark} for every known subreddit in one query.
+    """
+    return {watermark.subreddit: watermark for watermark in SubredditWatermark.objects.all()}
+
+
+def is_due(watermark, current_time):
+    return watermark is None or watermark.next_poll_at <= current_time
+
+
+def filter_changed_posts(trends, watermark):
+    """
+    Drop posts whose score and comment count are unchanged since the last poll.
+    """
+    seen = watermark.seen_posts if watermark else {}
+    return [
+        trend for trend in trends
+        if seen.get(trend['post_id']) != [trend['volume'], trend['num_comments']]
+    ]
+
+
+def advance_watermark(watermark, subreddit, trends, changed_count, current_time):
+    """
+    Record the listing just polled and adapt the polling interval to its churn:
+    back off while nothing changes, speed up when most of the listing changed.
+    """
+    if watermark is None:
+        watermark = SubredditWatermark(subreddit=subreddit, interval=SUBREDDIT_MIN_INTERVAL)
+
+    churn = changed_count / len(trends) if trends else 0
+    if churn == 0:
+        watermark.interval = min(watermark.interval * 2, SUBREDDIT_MAX_INTERVAL)
+    elif churn >= HIGH_CHURN_RATIO:
+        watermark.interval = max(watermark.interval // 2, SUBREDDIT_MIN_INTERVAL)
+
+    watermark.seen_posts = {trend['post_id']: [trend['volume'], trend['num_comments']] for trend in trends}
+    watermark.last_polled_at = current_time
+    watermark.next_poll_at = current_time + timedelta(seconds=watermark.interval)
+    return watermark
+
+
+def save_watermarks(watermarks):
+    new = [watermark for watermark in watermarks if watermark.pk is None]
+    existing = [watermark for watermark in watermarks if watermark.pk is not None]
+    if new:
+        SubredditWatermark.objects.bulk_create(new)
+    if existing:
+        SubredditWatermark.objects.bulk_update(
+            existing, ['seen_posts', 'interval', 'last_polled_at', 'next_poll_at'],
+        )